@@ -1,26 +1,64 @@
-from matchescu.clustering._base import ClusteringAlgorithm
+from matchescu.clustering._base import (
+    ClusteringAlgorithm,
+    CsrGraph,
+    GraphBackend,
+    Partition,
+)
 from matchescu.clustering._cc import ConnectedComponents
-from matchescu.clustering._center import ParentCenterClustering
-from matchescu.clustering._corr import WeightedCorrelationClustering
+from matchescu.clustering._center import (
+    CenterClustering,
+    MergeCenterClustering,
+    ParentCenterClustering,
+    StarClustering,
+)
+from matchescu.clustering._corr import (
+    ParallelPivotClustering,
+    WeightedCorrelationClustering,
+)
 from matchescu.clustering._wcc import WeaklyConnectedComponents
 from matchescu.clustering._ecp import (
     EquivalenceClassClustering,
     EquivalenceClassPartitioner,
 )
 from matchescu.clustering._mcl import MarkovClustering
+from matchescu.clustering._hac import (
+    Dendrogram,
+    HierarchicalAgglomerativeClustering,
+    Linkage,
+)
 from matchescu.clustering._gacl import ACLClustering, SeedStrategy, PartitionStrategy
 from matchescu.clustering._louvain import LouvainPartitioning
 from matchescu.clustering._leiden import LeidenPartitioning
-from matchescu.clustering._spectral import SpectralClustering
-
+from matchescu.clustering._parallel import ParallelComponentClustering, Transport
+from matchescu.clustering._spectral import (
+    Eigensolver,
+    KMeansInit,
+    KMeansMethod,
+    KMeansStats,
+    SpectralClustering,
+)
+from matchescu.clustering._stationary import StationaryMethod, StationarySolver
+from matchescu.clustering._sweep import ThresholdSweep
 
 __all__ = [
+    "CenterClustering",
     "ClusteringAlgorithm",
     "ConnectedComponents",
+    "CsrGraph",
+    "Dendrogram",
+    "Eigensolver",
     "EquivalenceClassClustering",
     "EquivalenceClassPartitioner",
+    "GraphBackend",
+    "HierarchicalAgglomerativeClustering",
+    "KMeansInit",
+    "KMeansMethod",
+    "KMeansStats",
+    "Linkage",
     "MarkovClustering",
+    "MergeCenterClustering",
     "ParentCenterClustering",
+    "Partition",
     "WeaklyConnectedComponents",
     "WeightedCorrelationClustering",
     "ACLClustering",
@@ -28,5 +66,12 @@ __all__ = [
     "PartitionStrategy",
     "LouvainPartitioning",
     "LeidenPartitioning",
+    "ParallelComponentClustering",
+    "ParallelPivotClustering",
     "SpectralClustering",
+    "StarClustering",
+    "StationaryMethod",
+    "StationarySolver",
+    "ThresholdSweep",
+    "Transport",
 ]
@@ -1,43 +1,442 @@
 import abc
-from collections.abc import Iterable
+from collections.abc import Iterable, Sequence
+from enum import StrEnum
 from typing import TypeVar, Hashable, Generic
 
 import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csgraph
 
 from matchescu.similarity import ReferenceGraph
 
 T = TypeVar("T", bound=Hashable)
 
 
+def _index_dtype(size: int) -> type[np.integer]:
+    return np.int32 if size < np.iinfo(np.int32).max else np.int64
+
+
+class Partition(Generic[T]):
+    """Compact partition of a collection of items.
+
+    Items are interned once into a tuple and each item carries an ``int32``
+    cluster label in ``[0, len(partition))``. Membership queries and cluster
+    statistics run on the label array; the frozenset-of-frozensets form is
+    only built when asked for, and then cached.
+    """
+
+    def __init__(self, items: Sequence[T], labels: np.ndarray) -> None:
+        self._items = tuple(items)
+        labels = np.asarray(labels)
+        if labels.shape != (len(self._items),):
+            raise ValueError("expected exactly one label per item")
+        if labels.size > 0 and (labels.min() < 0 or not np.bincount(labels).all()):
+            _, labels = np.unique(labels, return_inverse=True)
+        self._labels = np.array(labels, dtype=np.int32)
+        self._labels.flags.writeable = False
+        self._count = int(self._labels.max()) + 1 if self._labels.size > 0 else 0
+        self._index: dict[T, int] | None = None
+        self._clusters: frozenset[frozenset[T]] | None = None
+
+    @classmethod
+    def from_clusters(
+        cls, items: Iterable[T], clusters: Iterable[Iterable[T]] | None
+    ) -> "Partition[T]":
+        """Label ``items`` by the cluster they belong to.
+
+        Items missing from every cluster become singletons; cluster members
+        missing from ``items`` are appended to the partition.
+        """
+        index = dict.fromkeys(items)
+        for idx, item in enumerate(index):
+            index[item] = idx
+        positions: list[int] = []
+        cluster_labels: list[int] = []
+        for label, cluster in enumerate(clusters or ()):
+            for item in cluster:
+                positions.append(index.setdefault(item, len(index)))
+                cluster_labels.append(label)
+        assigned = cluster_labels[-1] + 1 if cluster_labels else 0
+        labels = np.full(len(index), -1, dtype=np.int64)
+        labels[positions] = cluster_labels
+        unassigned = labels < 0
+        labels[unassigned] = assigned + np.arange(np.count_nonzero(unassigned))
+        return cls(list(index), labels)
+
+    def __repr__(self) -> str:
+        return "Partition(items={}, clusters={})".format(len(self._items), self._count)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self):
+        return iter(self.to_frozensets())
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Partition):
+            return NotImplemented
+        if len(self) != len(other) or len(self._items) != len(other._items):
+            return False
+        try:
+            other_labels = other._labels[other.index_array(self._items)]
+        except KeyError:
+            return False
+        # equal iff the labels of one partition are a relabelling of the other
+        pairs = self._labels.astype(np.int64) * other._count + other_labels
+        return len(np.unique(pairs)) == self._count
+
+    __hash__ = None
+
+    @property
+    def items(self) -> tuple[T, ...]:
+        return self._items
+
+    @property
+    def labels(self) -> np.ndarray:
+        return self._labels
+
+    def _item_index(self) -> dict[T, int]:
+        if self._index is None:
+            self._index = {item: idx for idx, item in enumerate(self._items)}
+        return self._index
+
+    def index_array(self, items: Iterable[T]) -> np.ndarray:
+        """Return the positions of ``items`` in ``self.items``."""
+        index = self._item_index()
+        return np.fromiter((index[item] for item in items), dtype=np.int64)
+
+    def label_of(self, item: T) -> int:
+        return int(self._labels[self._item_index()[item]])
+
+    def same_cluster(self, a: T, b: T) -> bool:
+        return self.label_of(a) == self.label_of(b)
+
+    def members(self, label: int) -> frozenset[T]:
+        return frozenset(
+            self._items[idx] for idx in np.flatnonzero(self._labels == label).tolist()
+        )
+
+    def sizes(self) -> np.ndarray:
+        """Number of items in every cluster, indexed by cluster label."""
+        return np.bincount(self._labels, minlength=self._count)
+
+    def size_histogram(self) -> np.ndarray:
+        """Number of clusters of every size, indexed by cluster size."""
+        return np.bincount(self.sizes())
+
+    def to_frozensets(self) -> frozenset[frozenset[T]]:
+        if self._clusters is None:
+            order = np.argsort(self._labels, kind="stable")
+            boundaries = np.flatnonzero(np.diff(self._labels[order])) + 1
+            items = self._items
+            self._clusters = frozenset(
+                frozenset(items[idx] for idx in group.tolist())
+                for group in np.split(order, boundaries)
+                if len(group) > 0
+            )
+        return self._clusters
+
+
+class GraphBackend(StrEnum):
+    """Library used to traverse the match graph."""
+
+    NETWORKX = "networkx"
+    SCIPY = "scipy"
+
+
+class CsrGraph(Generic[T]):
+    """Integer-indexed snapshot of the matches in a ``ReferenceGraph``.
+
+    Node identifiers are interned once into ``nodes``; row ``i`` of the
+    compressed sparse row arrays (``indptr``, ``indices``, ``weights``) holds
+    the matches leaving ``nodes[i]``. Column indices are sorted within each
+    row. Undirected graphs keep every match once, in the orientation reported
+    by ``ReferenceGraph.matches``.
+
+    Build a snapshot once per graph and threshold, then hand it to any number
+    of clustering algorithms instead of the ``ReferenceGraph``.
+    """
+
+    def __init__(
+        self,
+        nodes: Sequence[T],
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        weights: np.ndarray,
+        directed: bool = True,
+        threshold: float = 0.0,
+    ) -> None:
+        self._nodes = tuple(nodes)
+        self._index = {node: idx for idx, node in enumerate(self._nodes)}
+        if len(self._index) != len(self._nodes):
+            raise ValueError("snapshot nodes must be unique")
+        self._indptr = np.asarray(indptr, dtype=np.int64)
+        self._indices = np.asarray(indices, dtype=_index_dtype(len(self._nodes)))
+        self._weights = np.asarray(weights, dtype=np.float64)
+        if len(self._indptr) != len(self._nodes) + 1:
+            raise ValueError("indptr must have one entry more than there are nodes")
+        self._directed = directed
+        self._threshold = threshold
+
+    def __repr__(self) -> str:
+        return "CsrGraph(nodes={}, edges={}, directed={}, threshold={})".format(
+            len(self._nodes), len(self._indices), self._directed, self._threshold
+        )
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    @classmethod
+    def from_edges(
+        cls,
+        nodes: Sequence[T],
+        src: np.ndarray,
+        dst: np.ndarray,
+        weights: np.ndarray,
+        directed: bool = True,
+        threshold: float = 0.0,
+    ) -> "CsrGraph[T]":
+        """Build a snapshot from parallel arrays of node indexes and weights."""
+        n = len(nodes)
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float64)
+        order = np.lexsort((dst, src))
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+        return cls(nodes, indptr, dst[order], weights[order], directed, threshold)
+
+    @classmethod
+    def from_reference_graph(
+        cls,
+        reference_graph: ReferenceGraph,
+        threshold: float = 0.0,
+        nodes: Iterable[T] | None = None,
+    ) -> "CsrGraph[T]":
+        """Snapshot the matches of ``reference_graph`` at ``threshold``.
+
+        Matched nodes are interned in the order of ``reference_graph.nodes`` so
+        that rows are visited in the same order ``ReferenceGraph.matches``
+        reports edges.
+
+        :param reference_graph: the similarity graph to snapshot
+        :param threshold: minimum weight of an edge for it to count as a match
+        :param nodes: nodes to include even when they are not matched; they
+            are appended after the matched nodes.
+
+        :return: a snapshot of the matches in ``reference_graph``.
+        """
+        matches = []
+        for u, v, data in reference_graph.edges:
+            weight = data.get("weight", 0.0)
+            if threshold <= weight <= 1.0:
+                matches.append((u, v, weight))
+        matched = {node for u, v, _ in matches for node in (u, v)}
+        index = dict.fromkeys(node for node in reference_graph.nodes if node in matched)
+        if nodes is not None:
+            index.update(dict.fromkeys(nodes))
+        for idx, node in enumerate(index):
+            index[node] = idx
+        src = np.fromiter((index[u] for u, _, _ in matches), np.int64, len(matches))
+        dst = np.fromiter((index[v] for _, v, _ in matches), np.int64, len(matches))
+        weights = np.fromiter((w for _, _, w in matches), np.float64, len(matches))
+        return cls.from_edges(
+            list(index), src, dst, weights, reference_graph.directed, threshold
+        )
+
+    @property
+    def nodes(self) -> tuple[T, ...]:
+        return self._nodes
+
+    @property
+    def directed(self) -> bool:
+        return self._directed
+
+    @property
+    def threshold(self) -> float:
+        return self._threshold
+
+    @property
+    def indptr(self) -> np.ndarray:
+        return self._indptr
+
+    @property
+    def indices(self) -> np.ndarray:
+        return self._indices
+
+    @property
+    def weights(self) -> np.ndarray:
+        return self._weights
+
+    @property
+    def edge_count(self) -> int:
+        return len(self._indices)
+
+    def index_of(self, node: T) -> int:
+        return self._index[node]
+
+    def out_degrees(self) -> np.ndarray:
+        return np.diff(self._indptr)
+
+    def sources(self) -> np.ndarray:
+        """Row index of every stored edge, aligned with ``indices``."""
+        return np.repeat(
+            np.arange(len(self._nodes), dtype=self._indices.dtype), self.out_degrees()
+        )
+
+    def edges(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return the ``(src, dst, weight)`` arrays of all stored edges."""
+        return self.sources(), self._indices, self._weights
+
+    def neighbors(self, idx: int) -> tuple[np.ndarray, np.ndarray]:
+        """Return the indexes and weights of the edges leaving node ``idx``."""
+        lo, hi = self._indptr[idx], self._indptr[idx + 1]
+        return self._indices[lo:hi], self._weights[lo:hi]
+
+    def neighbor_index(self) -> tuple[np.ndarray, np.ndarray]:
+        """Return CSR ``(indptr, indices)`` arrays of the nodes linked to each node.
+
+        Directed snapshots list out-neighbours. Undirected snapshots list
+        every edge from both of its ends.
+        """
+        if self._directed:
+            return self._indptr, self._indices
+        src, dst, _ = self.edges()
+        both_src = np.concatenate((src, dst))
+        both_dst = np.concatenate((dst, src))
+        order = np.lexsort((both_dst, both_src))
+        indptr = np.zeros(len(self._nodes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(both_src, minlength=len(self._nodes)), out=indptr[1:])
+        return indptr, both_dst[order]
+
+    def _edge_weight(self, i: int, j: int) -> float | None:
+        lo, hi = self._indptr[i], self._indptr[i + 1]
+        pos = lo + np.searchsorted(self._indices[lo:hi], j)
+        if pos < hi and self._indices[pos] == j:
+            return float(self._weights[pos])
+        return None
+
+    def weight(self, u: T, v: T) -> float:
+        """Same contract as ``ReferenceGraph.weight``, restricted to matches."""
+        i = self._index.get(u)
+        j = self._index.get(v)
+        if i is None or j is None:
+            return 0.0
+        weight = self._edge_weight(i, j)
+        if weight is None and not self._directed:
+            weight = self._edge_weight(j, i)
+        return 0.0 if weight is None else weight
+
+    def restrict(self, threshold: float) -> "CsrGraph[T]":
+        """Drop the edges lighter than ``threshold``.
+
+        Snapshots built at a threshold at least as strict are returned as is.
+        """
+        if threshold <= self._threshold:
+            return self
+        keep = self._weights >= threshold
+        src, dst, weights = self.edges()
+        return CsrGraph.from_edges(
+            self._nodes,
+            src[keep],
+            dst[keep],
+            weights[keep],
+            self._directed,
+            threshold,
+        )
+
+    def with_nodes(self, nodes: Iterable[T]) -> "CsrGraph[T]":
+        """Return a snapshot that also contains ``nodes`` as isolated nodes.
+
+        Snapshots that already contain every node are returned as is.
+        """
+        missing = [node for node in dict.fromkeys(nodes) if node not in self._index]
+        if not missing:
+            return self
+        indptr = np.concatenate(
+            (self._indptr, np.full(len(missing), self._indptr[-1], dtype=np.int64))
+        )
+        return CsrGraph(
+            self._nodes + tuple(missing),
+            indptr,
+            self._indices,
+            self._weights,
+            self._directed,
+            self._threshold,
+        )
+
+    def index_array(self, nodes: Iterable[T]) -> np.ndarray:
+        """Return the snapshot indexes of ``nodes`` as an integer array."""
+        return np.fromiter((self._index[node] for node in nodes), dtype=np.int64)
+
+    def to_scipy(self) -> sp.csr_array:
+        """Weighted adjacency matrix of the snapshot, sharing its arrays."""
+        n = len(self._nodes)
+        return sp.csr_array(
+            (self._weights, self._indices, self._indptr), shape=(n, n), copy=False
+        )
+
+    def connected_components(self, connection: str = "weak") -> np.ndarray:
+        """Label every node with the index of its connected component.
+
+        Undirected snapshots ignore ``connection``. Weights are not read, so
+        zero-weight matches still connect their endpoints.
+        """
+        n = len(self._nodes)
+        pattern = sp.csr_array(
+            (np.ones(len(self._indices), dtype=np.int8), self._indices, self._indptr),
+            shape=(n, n),
+        )
+        _, labels = csgraph.connected_components(
+            pattern, directed=self._directed, connection=connection
+        )
+        return labels
+
+
 class ClusteringAlgorithm(Generic[T], metaclass=abc.ABCMeta):
     def __init__(self, all_refs: Iterable[T], threshold: float) -> None:
         self._items = list(set(all_refs))
         self._threshold = threshold
 
+    def _snapshot(self, similarity_graph: ReferenceGraph | CsrGraph[T]) -> CsrGraph[T]:
+        """Return the matches of ``similarity_graph`` as a ``CsrGraph``.
+
+        The result always contains every item, matched or not.
+        """
+        if isinstance(similarity_graph, CsrGraph):
+            return similarity_graph.restrict(self._threshold).with_nodes(self._items)
+        return CsrGraph.from_reference_graph(
+            similarity_graph, self._threshold, self._items
+        )
+
     @abc.abstractmethod
-    def __call__(self, similarity_graph: ReferenceGraph) -> frozenset[frozenset[T]]:
+    def __call__(
+        self, similarity_graph: ReferenceGraph | CsrGraph[T]
+    ) -> frozenset[frozenset[T]]:
         pass
 
+    def partition(self, similarity_graph: ReferenceGraph | CsrGraph[T]) -> Partition[T]:
+        """Cluster ``similarity_graph`` into a compact ``Partition``."""
+        return Partition.from_clusters(self._items, self(similarity_graph))
+
 
 class NxDirectedMixin:
     @classmethod
-    def _to_directed(cls, reference_graph: ReferenceGraph, t: float) -> nx.DiGraph:
+    def _to_directed(cls, graph: CsrGraph) -> nx.DiGraph:
         g = nx.DiGraph()
-        for u, v in reference_graph.matches(t):
-            g.add_edge(u, v, weight=reference_graph.weight(u, v))
+        nodes = graph.nodes
+        src, dst, weights = graph.edges()
+        g.add_weighted_edges_from(
+            (nodes[u], nodes[v], w)
+            for u, v, w in zip(src.tolist(), dst.tolist(), weights.tolist())
+        )
         return g
 
 
 class SingletonHandlerMixin(Generic[T]):
     @classmethod
     def _add_singletons(
-        cls, items: Iterable[T], clusters: Iterable[Iterable[T]]
-    ) -> frozenset[frozenset[T]]:
-        unassigned = items
-        partition = []
-        if clusters is not None:
-            assigned = set(node for cluster in clusters for node in cluster)
-            unassigned = set(items) - assigned
-            partition = [frozenset(node for node in cluster) for cluster in clusters]
-        partition.extend(frozenset([ref]) for ref in unassigned)
-        return frozenset(cluster for cluster in partition)
+        cls, items: Iterable[T], clusters: Iterable[Iterable[T]] | None
+    ) -> Partition[T]:
+        return Partition.from_clusters(items, clusters)
@@ -5,25 +5,45 @@ import networkx as nx
 from matchescu.similarity import ReferenceGraph
 from matchescu.typing import EntityReferenceIdentifier
 
-from matchescu.clustering._base import T, ClusteringAlgorithm
+from matchescu.clustering._base import (
+    T,
+    ClusteringAlgorithm,
+    CsrGraph,
+    GraphBackend,
+    Partition,
+)
 
 
 class ConnectedComponents(ClusteringAlgorithm[T]):
-    def __init__(self, all_refs: Iterable[T], threshold: float = 0.75) -> None:
+    def __init__(
+        self,
+        all_refs: Iterable[T],
+        threshold: float = 0.75,
+        backend: GraphBackend = GraphBackend.SCIPY,
+    ) -> None:
         super().__init__(all_refs, threshold)
+        self._backend = backend
 
     def __call__(
-        self, reference_graph: ReferenceGraph
+        self, reference_graph: ReferenceGraph | CsrGraph[T]
     ) -> frozenset[frozenset[EntityReferenceIdentifier]]:
+        return self.partition(reference_graph).to_frozensets()
+
+    def partition(self, reference_graph: ReferenceGraph | CsrGraph[T]) -> Partition[T]:
         if reference_graph.directed:
             raise ValueError(
                 "Connected components cannot be computed on directed graphs"
             )
 
+        graph = self._snapshot(reference_graph)
+        if self._backend == GraphBackend.SCIPY:
+            return Partition(graph.nodes, graph.connected_components())
+
+        nodes = graph.nodes
+        src, dst, _ = graph.edges()
         g = nx.Graph()
-        g.add_nodes_from(self._items)
-        for u, v in reference_graph.matches(self._threshold):
-            g.add_edge(u, v, weight=reference_graph.weight(u, v))
-        return frozenset(
-            frozenset(v for v in comp) for comp in nx.connected_components(g)
+        g.add_nodes_from(nodes)
+        g.add_edges_from(
+            (nodes[u], nodes[v]) for u, v in zip(src.tolist(), dst.tolist())
         )
+        return Partition.from_clusters(graph.nodes, nx.connected_components(g))
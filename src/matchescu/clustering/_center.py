@@ -1,82 +1,187 @@
-from collections import defaultdict
 from collections.abc import Iterable
 
-import networkx as nx
+import numpy as np
 from matchescu.similarity import ReferenceGraph
 
-from matchescu.clustering._base import T, ClusteringAlgorithm
+from matchescu.clustering._base import T, ClusteringAlgorithm, CsrGraph, Partition
+from matchescu.clustering._corr import kwik_cluster, pair_weights
+
+
+def best_predecessors(graph: CsrGraph) -> np.ndarray:
+    """Return the heaviest incoming edge's source for every node.
+
+    A pair matched in both directions only counts in its first stored
+    orientation. Ties go to the first stored edge and nodes without incoming
+    edges are their own predecessor.
+    """
+    n = len(graph)
+    src, dst, weights = graph.edges()
+    src, dst = src.astype(np.int64), dst.astype(np.int64)
+    # CSR order stores u -> v before v -> u whenever u < v
+    reverse = np.isin(dst * n + src, src * n + dst)
+    keep = ~(reverse & (dst < src))
+    src, dst, weights = src[keep], dst[keep], weights[keep]
+    best = np.arange(n, dtype=np.int64)
+    if src.size == 0:
+        return best
+    order = np.lexsort((np.arange(src.size), -weights, dst))
+    first = np.ones(order.size, dtype=bool)
+    first[1:] = dst[order[1:]] != dst[order[:-1]]
+    best[dst[order[first]]] = src[order[first]]
+    return best
+
+
+def resolve_roots(parents: np.ndarray) -> np.ndarray:
+    """Resolve every node of the ``parents`` forest to its root by pointer jumping.
+
+    Every step doubles the distance covered, so paths of length ``d`` take
+    ``O(log d)`` array passes. Nodes leading into a cycle resolve to the
+    smallest node of the cycle.
+    """
+    jump = parents.astype(np.int64, copy=True)
+    low = np.minimum(jump, np.arange(len(jump)))
+    covered = 1
+    while covered < len(jump):
+        following = jump[jump]
+        if np.array_equal(following, jump):
+            break
+        low = np.minimum(low, low[jump])
+        jump = following
+        covered *= 2
+    # ``jump`` now lands on a root or a cycle, whose ``low`` spans the cycle
+    return low[jump]
 
 
 class ParentCenterClustering(ClusteringAlgorithm[T]):
+    """Link every node to the source of its heaviest incoming match.
+
+    Each node joins the cluster of the root reached by repeatedly following
+    those links. Chains that loop back on themselves form one cluster.
+    """
+
     def __init__(self, all_refs: Iterable[T], threshold: float = 0.75) -> None:
         super().__init__(all_refs, threshold)
 
-    @staticmethod
-    def _find_root(parents, node):
-        path = []
-        visited = set()
-
-        while parents[node] != node:
-            if node in visited:
-                parents[node] = node
-                break
-
-            visited.add(node)
-            path.append(node)
-            node = parents[node]
-
-        for n in path:
-            # path compression using the last node in the path
-            parents[n] = node
-
-        return node
-
-    def _construct_dag(self, reference_graph):
-        graph = nx.DiGraph()
-        graph.add_nodes_from(self._items)
-        seen_pairs = set()
-        for u, v in reference_graph.matches(self._threshold):
-            if (v, u) in seen_pairs:
-                continue
-            w = max(
-                reference_graph.weight(u, v),
-                reference_graph.weight(v, u),
-            )
-            graph.add_edge(u, v, weight=w)
-            seen_pairs.add((u, v))
-        return graph
-
-    def __call__(self, reference_graph: ReferenceGraph) -> frozenset[frozenset[T]]:
-        graph = self._construct_dag(reference_graph)
-        parents = {node: node for node in self._items}
-        updated = True
-
-        while updated:
-            updated = False
-            new_parents = parents.copy()
-            for node in self._items:
-                best_parent = node
-                max_similarity = -1
-
-                for predecessor in graph.predecessors(node):
-                    similarity = reference_graph.weight(predecessor, node)
-                    if similarity > max_similarity:
-                        max_similarity = similarity
-                        best_parent = predecessor
-
-                # Update parent to the parent of the best predecessor
-                if best_parent != node:
-                    root_parent = self._find_root(parents, best_parent)
-                    if new_parents[node] != root_parent:
-                        new_parents[node] = root_parent
-                        updated = True
-
-            parents = new_parents
-
-        result = defaultdict(list)
-        for u, v in parents.items():
-            result[v].append(u)
-
-        return frozenset(
-            frozenset(node for node in cluster) for cluster in result.values()
+    def __call__(
+        self, reference_graph: ReferenceGraph | CsrGraph[T]
+    ) -> frozenset[frozenset[T]]:
+        return self.partition(reference_graph).to_frozensets()
+
+    def partition(self, reference_graph: ReferenceGraph | CsrGraph[T]) -> Partition[T]:
+        graph = self._snapshot(reference_graph)
+        return Partition(graph.nodes, resolve_roots(best_predecessors(graph)))
+
+
+def _pairs_by_weight(graph: CsrGraph[T]) -> tuple[list[int], list[int]]:
+    """Every linked pair once, heaviest first, ties broken by node index."""
+    a, b, weights = pair_weights(graph)
+    order = np.lexsort((b, a, -weights))
+    return a[order].tolist(), b[order].tolist()
+
+
+def _labels(assigned: list[int]) -> np.ndarray:
+    labels = np.asarray(assigned, dtype=np.int64)
+    unassigned = labels < 0
+    labels[unassigned] = np.flatnonzero(unassigned)
+    return labels
+
+
+class CenterClustering(ClusteringAlgorithm[T]):
+    """CENTER clustering in a single pass over the matches.
+
+    Matches are visited from the most to the least similar. When neither
+    end is clustered, the first one becomes the center of a new cluster that
+    the other joins. An unclustered node linked to a center joins it. Every
+    other match is ignored and nodes left unclustered are singletons. Runs
+    in ``O(m log m)``.
+    """
+
+    def __init__(self, all_refs: Iterable[T], threshold: float = 0.75) -> None:
+        super().__init__(all_refs, threshold)
+
+    def __call__(
+        self, reference_graph: ReferenceGraph | CsrGraph[T]
+    ) -> frozenset[frozenset[T]]:
+        return self.partition(reference_graph).to_frozensets()
+
+    def partition(self, reference_graph: ReferenceGraph | CsrGraph[T]) -> Partition[T]:
+        graph = self._snapshot(reference_graph)
+        center = [-1] * len(graph)
+        for u, v in zip(*_pairs_by_weight(graph)):
+            cu, cv = center[u], center[v]
+            if cu < 0 and cv < 0:
+                center[u] = center[v] = u
+            elif cu == u and cv < 0:
+                center[v] = u
+            elif cv == v and cu < 0:
+                center[u] = v
+        return Partition(graph.nodes, _labels(center))
+
+
+class MergeCenterClustering(CenterClustering[T]):
+    """MERGE-CENTER clustering in a single pass over the matches.
+
+    Works like ``CenterClustering`` but also merges two clusters whenever a
+    match links the center of one to any node of the other.
+    """
+
+    def partition(self, reference_graph: ReferenceGraph | CsrGraph[T]) -> Partition[T]:
+        graph = self._snapshot(reference_graph)
+        center = [-1] * len(graph)
+        # union-find over the centers of merged clusters
+        parent = list(range(len(graph)))
+
+        def find(x: int) -> int:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for u, v in zip(*_pairs_by_weight(graph)):
+            cu, cv = center[u], center[v]
+            if cu < 0 and cv < 0:
+                center[u] = center[v] = u
+            elif cv < 0:
+                if cu == u:
+                    center[v] = u
+            elif cu < 0:
+                if cv == v:
+                    center[u] = v
+            elif cu == u or cv == v:
+                root_u, root_v = find(cu), find(cv)
+                if root_u != root_v:
+                    parent[max(root_u, root_v)] = min(root_u, root_v)
+        return Partition(
+            graph.nodes,
+            _labels([find(c) if c >= 0 else -1 for c in center]),
         )
+
+
+class StarClustering(ClusteringAlgorithm[T]):
+    """Star clustering with non-overlapping stars.
+
+    Nodes are visited by decreasing number of matches. A node that is not
+    in a star yet becomes the center of a new star, which every neighbour
+    that is not in a star yet joins as a satellite. Runs in ``O(n + m)``
+    after sorting the nodes.
+    """
+
+    def __init__(self, all_refs: Iterable[T], threshold: float = 0.75) -> None:
+        super().__init__(all_refs, threshold)
+
+    def __call__(
+        self, reference_graph: ReferenceGraph | CsrGraph[T]
+    ) -> frozenset[frozenset[T]]:
+        return self.partition(reference_graph).to_frozensets()
+
+    def partition(self, reference_graph: ReferenceGraph | CsrGraph[T]) -> Partition[T]:
+        graph = self._snapshot(reference_graph)
+        n = len(graph)
+        a, b, _ = pair_weights(graph)
+        src, dst = np.concatenate((a, b)), np.concatenate((b, a))
+        order = np.argsort(src, kind="stable")
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+        degrees = np.diff(indptr)
+        visit = np.lexsort((np.arange(n), -degrees))
+        return Partition(graph.nodes, kwik_cluster(indptr, dst[order], visit))
@@ -1,41 +1,297 @@
-import random
 from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
 
 from matchescu.similarity import ReferenceGraph
 
-from matchescu.clustering._base import T, ClusteringAlgorithm
+from matchescu.clustering._base import T, ClusteringAlgorithm, CsrGraph, Partition
+
+
+def kwik_cluster(
+    indptr: np.ndarray, indices: np.ndarray, order: np.ndarray
+) -> np.ndarray:
+    """Run one KwikCluster pass visiting pivots in ``order``."""
+    labels = np.full(len(indptr) - 1, -1, dtype=np.int64)
+    next_label = 0
+    for pivot in order.tolist():
+        if labels[pivot] >= 0:
+            continue
+        labels[pivot] = next_label
+        neighbours = indices[indptr[pivot] : indptr[pivot + 1]]
+        labels[neighbours[labels[neighbours] < 0]] = next_label
+        next_label += 1
+    return labels
+
+
+def pair_weights(graph: CsrGraph) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return every linked pair ``(a, b)`` with ``a < b`` once, with its weight.
+
+    Pairs matched in both directions keep the heavier weight.
+    """
+    src, dst, weights = graph.edges()
+    a = np.minimum(src, dst).astype(np.int64)
+    b = np.maximum(src, dst).astype(np.int64)
+    distinct = a != b
+    a, b, weights = a[distinct], b[distinct], weights[distinct]
+    order = np.lexsort((-weights, b, a))
+    a, b, weights = a[order], b[order], weights[order]
+    first = np.ones(len(a), dtype=bool)
+    first[1:] = (a[1:] != a[:-1]) | (b[1:] != b[:-1])
+    return a[first], b[first], weights[first]
+
+
+def disagreements(
+    a: np.ndarray, b: np.ndarray, weights: np.ndarray, labels: np.ndarray
+) -> float:
+    """Weighted disagreements of ``labels`` with the pairs ``(a, b, weights)``.
+
+    Linked pairs split across clusters cost their weight, pairs inside a
+    cluster cost one minus their weight, unlinked pairs having weight zero.
+    """
+    sizes = np.bincount(np.unique(labels, return_inverse=True)[1]).astype(np.float64)
+    together = labels[a] == labels[b]
+    inside = weights[together].sum()
+    return float((sizes * (sizes - 1) / 2).sum() - inside + weights.sum() - inside)
+
+
+def local_moves(
+    n: int,
+    a: np.ndarray,
+    b: np.ndarray,
+    weights: np.ndarray,
+    labels: np.ndarray,
+    max_sweeps: int = 10,
+) -> np.ndarray:
+    """Move single nodes between clusters while that lowers ``disagreements``.
+
+    Keeping node ``x`` in cluster ``C`` costs ``|C - {x}| - 2 * w(x, C)``
+    relative to making it a singleton, so each node moves to the neighbouring
+    cluster, or to a cluster of its own, that minimises that cost.
+    """
+    _, labels = np.unique(labels, return_inverse=True)
+    # label n + x is reserved for x on its own
+    sizes = np.bincount(labels, minlength=2 * n).tolist()
+    labels = labels.tolist()
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(np.concatenate((a, b)), minlength=n), out=indptr[1:])
+    order = np.argsort(np.concatenate((a, b)), kind="stable")
+    neighbours = np.concatenate((b, a))[order].tolist()
+    neighbour_weights = np.concatenate((weights, weights))[order].tolist()
+    bounds = indptr.tolist()
+
+    for _ in range(max_sweeps):
+        moved = False
+        for x in range(n):
+            lo, hi = bounds[x], bounds[x + 1]
+            if lo == hi:
+                continue
+            own = labels[x]
+            linked: dict[int, float] = {}
+            for y, w in zip(neighbours[lo:hi], neighbour_weights[lo:hi]):
+                linked[labels[y]] = linked.get(labels[y], 0.0) + w
+            current = sizes[own] - 1 - 2 * linked.get(own, 0.0)
+            # a cluster of its own costs nothing
+            target, cost = n + x, 0.0
+            for label, weight in linked.items():
+                label_cost = sizes[label] - (label == own) - 2 * weight
+                if label_cost < cost:
+                    target, cost = label, label_cost
+            if cost < current - 1e-12 and target != own:
+                sizes[own] -= 1
+                sizes[target] += 1
+                labels[x] = target
+                moved = True
+        if not moved:
+            break
+    return np.asarray(labels, dtype=np.int64)
 
 
 class WeightedCorrelationClustering(ClusteringAlgorithm[T]):
+    """KwikCluster pivoting over the matches of a similarity graph.
+
+    Nodes are visited in a random order. Every node that is still unclustered
+    when visited becomes a pivot and takes all of its unclustered neighbours
+    into its cluster. Only the pivot's adjacency list is read, so a run costs
+    ``O(n + m)``.
+
+    :param all_refs: the references to cluster
+    :param threshold: minimum weight of a match
+    :param random_seed: seed of the instance's random generator
+    :param restarts: number of randomized passes. The partition with the
+        fewest weighted disagreements is kept.
+    :param refine: improve the kept partition with local moves
+    :param max_workers: when greater than one, the passes run in a process
+        pool of this size
+    """
+
     def __init__(
         self,
         all_refs: Iterable[T],
         threshold: float = 0.75,
         random_seed: int | None = None,
+        restarts: int = 1,
+        refine: bool = False,
+        max_workers: int = 1,
     ) -> None:
         super().__init__(all_refs, threshold)
-        if random_seed:
-            random.seed(random_seed)
-
-    def __call__(self, reference_graph: ReferenceGraph) -> frozenset[frozenset[T]]:
-        unclustered_nodes = set(self._items)
-        all_clusters = []
-
-        while unclustered_nodes:
-            pivot = random.choice(list(unclustered_nodes))
-            nodes_to_check = list(unclustered_nodes - {pivot})
-            random.shuffle(nodes_to_check)
-
-            pivot_cluster = frozenset(
-                {pivot}
-                | set(
-                    node
-                    for node in nodes_to_check
-                    if reference_graph.weight(pivot, node) >= self._threshold
+        self._rng = np.random.default_rng(random_seed)
+        self._restarts = max(1, restarts)
+        self._refine = refine
+        self._max_workers = max(1, max_workers)
+
+    def __call__(
+        self, reference_graph: ReferenceGraph | CsrGraph[T]
+    ) -> frozenset[frozenset[T]]:
+        return self.partition(reference_graph).to_frozensets()
+
+    def _candidates(
+        self, indptr: np.ndarray, indices: np.ndarray, n: int
+    ) -> list[np.ndarray]:
+        orders = [self._rng.permutation(n) for _ in range(self._restarts)]
+        if self._max_workers == 1 or self._restarts == 1:
+            return [kwik_cluster(indptr, indices, order) for order in orders]
+        with ProcessPoolExecutor(max_workers=self._max_workers) as executor:
+            return list(
+                executor.map(
+                    kwik_cluster,
+                    [indptr] * len(orders),
+                    [indices] * len(orders),
+                    orders,
                 )
             )
 
-            all_clusters.append(pivot_cluster)
-            unclustered_nodes -= pivot_cluster
+    def partition(self, reference_graph: ReferenceGraph | CsrGraph[T]) -> Partition[T]:
+        graph = self._snapshot(reference_graph)
+        indptr, indices = graph.neighbor_index()
+        candidates = self._candidates(indptr, indices, len(graph))
+        if len(candidates) == 1 and not self._refine:
+            return Partition(graph.nodes, candidates[0])
+
+        a, b, weights = pair_weights(graph)
+        labels = min(
+            candidates, key=lambda labels: disagreements(a, b, weights, labels)
+        )
+        if self._refine:
+            labels = local_moves(len(graph), a, b, weights, labels)
+        return Partition(graph.nodes, labels)
+
+    def disagreements(
+        self, reference_graph: ReferenceGraph | CsrGraph[T], partition: Partition[T]
+    ) -> float:
+        """Score ``partition`` with the objective used to pick among restarts."""
+        graph = self._snapshot(reference_graph).with_nodes(partition.items)
+        labels = partition.labels[partition.index_array(graph.nodes)]
+        return disagreements(*pair_weights(graph), labels)
+
+
+class ParallelPivotClustering(ClusteringAlgorithm[T]):
+    """Correlation clustering that picks many pivots per round (ParallelPivot).
+
+    Every round, each unclustered node becomes active with probability
+    ``epsilon / max_degree`` of the remaining graph. Active nodes without an
+    active neighbour of higher priority are the round's pivots; since no two
+    pivots are linked, every pivot and every unclustered neighbour can be
+    assigned at once, each neighbour going to its highest priority pivot.
+    This keeps KwikCluster's constant-factor approximation in expectation
+    while needing only a polylogarithmic number of rounds.
+
+    :param all_refs: the references to cluster
+    :param threshold: minimum weight of a match
+    :param epsilon: controls the trade-off between rounds and quality. Larger
+        values pick more pivots per round.
+    :param random_seed: seed of the instance's random generator
+    :param max_workers: when greater than one, every round is computed over
+        chunks of the edge arrays by a thread pool of this size
+    """
+
+    def __init__(
+        self,
+        all_refs: Iterable[T],
+        threshold: float = 0.75,
+        epsilon: float = 0.5,
+        random_seed: int | None = None,
+        max_workers: int = 1,
+    ) -> None:
+        super().__init__(all_refs, threshold)
+        if not 0 < epsilon <= 1:
+            raise ValueError("epsilon must be in (0, 1]")
+        self._epsilon = epsilon
+        self._rng = np.random.default_rng(random_seed)
+        self._max_workers = max(1, max_workers)
+
+    def _chunks(self, size: int) -> list[slice]:
+        if self._max_workers == 1:
+            return [slice(0, size)]
+        bounds = np.linspace(0, size, self._max_workers + 1).astype(np.int64)
+        return [slice(lo, hi) for lo, hi in zip(bounds[:-1], bounds[1:]) if lo < hi]
+
+    def _map(self, executor, fn, chunks: list[slice]) -> list:
+        if executor is None:
+            return [fn(chunk) for chunk in chunks]
+        return list(executor.map(fn, chunks))
+
+    def __call__(
+        self, reference_graph: ReferenceGraph | CsrGraph[T]
+    ) -> frozenset[frozenset[T]]:
+        return self.partition(reference_graph).to_frozensets()
+
+    def partition(self, reference_graph: ReferenceGraph | CsrGraph[T]) -> Partition[T]:
+        graph = self._snapshot(reference_graph)
+        if self._max_workers == 1:
+            return self._partition(graph, None)
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            return self._partition(graph, executor)
+
+    def _partition(
+        self, graph: CsrGraph[T], executor: ThreadPoolExecutor | None
+    ) -> Partition[T]:
+        n = len(graph)
+        indptr, indices = graph.neighbor_index()
+        src = np.repeat(np.arange(n, dtype=np.int64), np.diff(indptr))
+        dst = indices.astype(np.int64)
+        # a lower rank means a higher priority
+        rank = self._rng.permutation(n)
+        node_at_rank = np.argsort(rank)
+        labels = np.full(n, -1, dtype=np.int64)
+
+        while True:
+            alive = labels < 0
+            keep = alive[src] & alive[dst] & (src != dst)
+            src, dst = src[keep], dst[keep]
+            if src.size == 0:
+                break
+            degrees = np.bincount(src, minlength=n)
+            if graph.directed:
+                degrees += np.bincount(dst, minlength=n)
+            active = alive & (self._rng.random(n) < self._epsilon / degrees.max())
+            chunks = self._chunks(src.size)
+
+            def blocked_in(chunk: slice) -> np.ndarray:
+                u, v = src[chunk], dst[chunk]
+                both = active[u] & active[v]
+                u, v = u[both], v[both]
+                blocked = np.zeros(n, dtype=bool)
+                blocked[np.where(rank[u] > rank[v], u, v)] = True
+                return blocked
+
+            pivots = active & ~np.logical_or.reduce(
+                self._map(executor, blocked_in, chunks) + [np.zeros(n, dtype=bool)]
+            )
+
+            def best_pivot_in(chunk: slice) -> np.ndarray:
+                u, v = src[chunk], dst[chunk]
+                from_pivot = pivots[u]
+                best = np.full(n, n, dtype=np.int64)
+                np.minimum.at(best, v[from_pivot], rank[u[from_pivot]])
+                return best
+
+            best = np.minimum.reduce(
+                self._map(executor, best_pivot_in, chunks) + [np.where(pivots, rank, n)]
+            )
+            assigned = np.flatnonzero(best < n)
+            labels[assigned] = node_at_rank[best[assigned]]
 
-        return frozenset(all_clusters)
+        singletons = labels < 0
+        labels[singletons] = np.flatnonzero(singletons)
+        return Partition(graph.nodes, labels)
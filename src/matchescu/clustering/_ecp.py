@@ -1,53 +1,84 @@
 from collections.abc import Iterable
 from typing import Generic
 
+import numpy as np
+
 from matchescu.similarity import ReferenceGraph
 
-from matchescu.clustering._base import T, ClusteringAlgorithm
+from matchescu.clustering._base import (
+    T,
+    ClusteringAlgorithm,
+    CsrGraph,
+    Partition,
+)
 
 
 class EquivalenceClassPartitioner(Generic[T]):
     def __init__(self, all_refs: Iterable[T]) -> None:
         self._items = list(set(all_refs))
+        self._index = {item: idx for idx, item in enumerate(self._items)}
+        self._dtype = (
+            np.int32 if len(self._items) < np.iinfo(np.int32).max else np.int64
+        )
+        self._reset()
+
+    def _reset(self) -> None:
+        self._parent = np.arange(len(self._items), dtype=self._dtype)
+
+    def index_array(self, items: Iterable[T]) -> np.ndarray:
+        """Map ``items`` to the integer ids accepted by ``union_pairs``.
+
+        Items that are not partitioned are mapped to ``-1``.
+        """
+        return np.fromiter((self._index.get(item, -1) for item in items), np.int64)
 
-    def _init_rank_and_path_compression(self):
-        self._rank = {item: 0 for item in self._items}
-        self._parent = {item: item for item in self._items}
-
-    def _find(self, x: T) -> T:
-        if self._parent[x] == x:
-            return x
-        # path compression
-        self._parent[x] = self._find(self._parent[x])
-        return self._parent[x]
-
-    def _union(self, x: T, y: T) -> None:
-        x_root = self._find(x)
-        y_root = self._find(y)
-
-        if x_root == y_root:
-            return
-
-        if self._rank[x_root] < self._rank[y_root]:
-            self._parent[x_root] = y_root
-        elif self._rank[y_root] < self._rank[x_root]:
-            self._parent[y_root] = x_root
-        else:
-            # does not matter which goes where
-            # make sure we increase the correct rank
-            self._parent[y_root] = x_root
-            self._rank[x_root] += 1
+    def _compress(self) -> np.ndarray:
+        # pointer jumping until every item points straight at its root
+        parent = self._parent
+        grandparent = parent[parent]
+        while not np.array_equal(grandparent, parent):
+            parent[:] = grandparent
+            grandparent = parent[parent]
+        return parent
+
+    def union_pairs(self, array_u: np.ndarray, array_v: np.ndarray) -> None:
+        """Merge the classes of ``array_u[i]`` and ``array_v[i]`` for every ``i``.
+
+        Both arrays hold integer ids as returned by ``index_array``. Each round
+        hooks every root with a pending pair onto the smallest root it is
+        paired with, then compresses all paths, so the number of rounds is
+        logarithmic in practice and every round runs at array speed.
+        """
+        u = np.asarray(array_u, dtype=np.int64)
+        v = np.asarray(array_v, dtype=np.int64)
+        if u.shape != v.shape:
+            raise ValueError("pair arrays must have the same shape")
+        parent = self._compress()
+        while u.size > 0:
+            u_root = parent[u]
+            v_root = parent[v]
+            pending = u_root != v_root
+            if not pending.any():
+                break
+            u, v = u[pending], v[pending]
+            u_root, v_root = u_root[pending], v_root[pending]
+            np.minimum.at(
+                parent,
+                np.maximum(u_root, v_root),
+                np.minimum(u_root, v_root).astype(parent.dtype),
+            )
+            parent = self._compress()
+
+    def partition(self) -> Partition[T]:
+        """Return the classes formed by the pairs merged so far."""
+        return Partition(self._items, self._compress())
 
     def __call__(self, pairs: Iterable[tuple[T, T]]) -> frozenset[frozenset[T]]:
-        self._init_rank_and_path_compression()
-        for x, y in pairs:
-            self._union(x, y)
-        classes = {item: dict() for item in self._items}
-        for item in self._items:
-            classes[self._find(item)][item] = None
-        return frozenset(
-            frozenset(eq_class) for eq_class in classes.values() if len(eq_class) > 0
-        )
+        self._reset()
+        index = self._index
+        flat = np.fromiter((index[item] for pair in pairs for item in pair), np.int64)
+        self.union_pairs(flat[0::2], flat[1::2])
+        return self.partition().to_frozensets()
 
 
 class EquivalenceClassClustering(ClusteringAlgorithm[T]):
@@ -55,5 +86,21 @@ class EquivalenceClassClustering(ClusteringAlgorithm[T]):
         super().__init__(all_refs, threshold)
         self._ecp = EquivalenceClassPartitioner(self._items)
 
-    def __call__(self, reference_graph: ReferenceGraph) -> frozenset[frozenset[T]]:
-        return self._ecp(reference_graph.matches(self._threshold))
+    def __call__(
+        self, reference_graph: ReferenceGraph | CsrGraph[T]
+    ) -> frozenset[frozenset[T]]:
+        return self.partition(reference_graph).to_frozensets()
+
+    def partition(self, reference_graph: ReferenceGraph | CsrGraph[T]) -> Partition[T]:
+        graph = self._snapshot(reference_graph)
+        positions = self._ecp.index_array(graph.nodes)
+        src, dst, _ = graph.edges()
+        u, v = positions[src], positions[dst]
+        unknown = np.flatnonzero((u < 0) | (v < 0))
+        if unknown.size > 0:
+            edge = unknown[0]
+            missing = src[edge] if u[edge] < 0 else dst[edge]
+            raise KeyError(graph.nodes[missing])
+        self._ecp._reset()
+        self._ecp.union_pairs(u, v)
+        return self._ecp.partition()
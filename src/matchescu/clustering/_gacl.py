@@ -9,6 +9,8 @@ from matchescu.clustering._base import (
     ClusteringAlgorithm,
     SingletonHandlerMixin,
     NxDirectedMixin,
+    CsrGraph,
+    Partition,
 )
 from matchescu.similarity import ReferenceGraph
 
@@ -129,6 +131,74 @@ class ACLClustering(ClusteringAlgorithm[T], SingletonHandlerMixin[T], NxDirected
         denominator = min(vol_s, 1.0 - vol_s)
         return cut / denominator if denominator > 0 else 1.0
 
+    @staticmethod
+    def _sweep_conductances(
+        order: np.ndarray, transition_matrix: sp.csr_matrix, phi: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Conductance of every prefix of ``order``, in a single pass.
+
+        The cut of ``S`` is ``vol(S)`` minus the flow ``phi_i * P_ij`` between
+        nodes of ``S``. That flow enters the running sum when the later of
+        ``i`` and ``j`` joins the prefix, so every edge is read once.
+
+        :return: the conductances and a bound on how far each one may be from
+            the value ``_measure_conductance`` computes for the same prefix
+        """
+        n = len(order)
+        rank = np.empty(n, dtype=np.int64)
+        rank[order] = np.arange(n)
+        transitions = sp.coo_array(transition_matrix)
+        joined = np.maximum(rank[transitions.row], rank[transitions.col])
+        inner = np.cumsum(
+            np.bincount(
+                joined, weights=phi[transitions.row] * transitions.data, minlength=n
+            )
+        )
+        vol = np.cumsum(phi[order])
+        cut = vol - inner
+        denominator = np.minimum(vol, 1.0 - vol)
+        # the running sums add up non-negative terms, so cut and denominator
+        # are both off by at most a small multiple of vol(S)
+        slack = 2 * (n + transitions.nnz) * np.finfo(np.float64).eps * vol
+        conductances = np.ones(n)
+        errors = np.full(n, np.inf)
+        defined = denominator > slack
+        conductances[defined] = cut[defined] / denominator[defined]
+        errors[defined] = (
+            slack[defined]
+            * (1.0 + np.abs(conductances[defined]))
+            / denominator[defined]
+        )
+        # empty volumes and the whole graph measure exactly one either way
+        errors[vol == 0.0] = 0.0
+        conductances[n - 1], errors[n - 1] = 1.0, 0.0
+        return conductances, errors
+
+    def _best_prefix(
+        self, order: np.ndarray, transition_matrix: sp.csr_matrix, phi: np.ndarray
+    ) -> tuple[int, float]:
+        """Length minus one and conductance of the best prefix of ``order``.
+
+        The first prefix with the lowest conductance wins. Running sums round
+        differently from measuring each prefix on its own, so the prefixes
+        that could be the best within rounding are measured one by one.
+        """
+        conductances, errors = self._sweep_conductances(order, transition_matrix, phi)
+        n = len(order)
+        rank = np.empty(n, dtype=np.int64)
+        rank[order] = np.arange(n)
+
+        def measure(j: int) -> float:
+            return self._measure_conductance(rank <= j, transition_matrix, phi)
+
+        bound = measure(int(np.argmin(conductances + errors)))
+        best, best_cond = -1, float("inf")
+        for j in np.flatnonzero(conductances - errors <= bound).tolist():
+            cond = measure(j)
+            if cond < best_cond:
+                best, best_cond = j, cond
+        return best, best_cond
+
     def _general_acl(
         self,
         digraph: nx.DiGraph,
@@ -180,18 +250,8 @@ class ACLClustering(ClusteringAlgorithm[T], SingletonHandlerMixin[T], NxDirected
         score = page_ranks / denom
         order = np.argsort(-score)
 
-        best_cond = float("inf")
-        best_set = None
-        cur_mask = np.zeros(node_count, dtype=bool)
-
-        for j in range(node_count):
-            cur_mask[order[j]] = True
-            cond = self._measure_conductance(cur_mask, transition_matrix, phi)
-            if cond < best_cond:
-                best_cond = cond
-                best_set = cur_mask.copy()
-
-        best_nodes = [nodes[i] for i in np.where(best_set)[0]]
+        best, best_cond = self._best_prefix(order, transition_matrix, phi)
+        best_nodes = [nodes[i] for i in np.sort(order[: best + 1])]
         return best_nodes, best_cond
 
     @staticmethod
@@ -310,7 +370,12 @@ class ACLClustering(ClusteringAlgorithm[T], SingletonHandlerMixin[T], NxDirected
                 expanded.extend(rep_to_nodes[rep])
             yield expanded, cond
 
-    def __call__(self, reference_graph: ReferenceGraph) -> frozenset[frozenset[T]]:
-        g = self._to_directed(reference_graph, self._threshold)
-        clusters = set(frozenset(c) for c, _ in self._strategy(g, self._alpha))
+    def __call__(
+        self, reference_graph: ReferenceGraph | CsrGraph[T]
+    ) -> frozenset[frozenset[T]]:
+        return self.partition(reference_graph).to_frozensets()
+
+    def partition(self, reference_graph: ReferenceGraph | CsrGraph[T]) -> Partition[T]:
+        g = self._to_directed(self._snapshot(reference_graph))
+        clusters = (c for c, _ in self._strategy(g, self._alpha))
         return self._add_singletons(self._items, clusters)
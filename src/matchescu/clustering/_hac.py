@@ -1,64 +1,432 @@
-import itertools
-from typing import Iterable
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from enum import StrEnum
+from os import PathLike
+from typing import BinaryIO, Generic, Iterable, Sequence
 
-import networkx as nx
 import numpy as np
-from scipy.cluster.hierarchy import linkage, fcluster
-from scipy.spatial.distance import squareform  # use condensed-form utility for HAC
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+from scipy.spatial.distance import cdist
 
 from matchescu.similarity import ReferenceGraph
 
-from matchescu.clustering._base import ClusteringAlgorithm, T
+from matchescu.clustering._base import ClusteringAlgorithm, CsrGraph, Partition, T
+
+# cdist metrics with distances in [0, 1], or in [0, 2] where distances above 1
+# only separate opposed vectors, so that 1 - distance clipped is a similarity
+_BOUNDED_METRICS = frozenset(
+    {"cosine", "correlation", "dice", "hamming", "jaccard", "russellrao", "yule"}
+)
+
+
+class Linkage(StrEnum):
+    AVERAGE = "average"
+    SINGLE = "single"
+    COMPLETE = "complete"
+
+
+def pair_similarities(
+    snapshot: CsrGraph[T], nodes: list[T]
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return the observed pairs ``(a, b)`` with ``a < b`` among ``nodes``.
+
+    Positions refer to ``nodes``. The similarity of a pair is the mean of the
+    weights in both directions, a missing direction weighing zero.
+    """
+    position = np.full(len(snapshot), -1, dtype=np.int64)
+    position[snapshot.index_array(nodes)] = np.arange(len(nodes))
+    src, dst, weights = snapshot.edges()
+    src, dst = position[src], position[dst]
+    among_nodes = (src >= 0) & (dst >= 0) & (src != dst)
+    src, dst, weights = src[among_nodes], dst[among_nodes], weights[among_nodes]
+    a, b = np.minimum(src, dst), np.maximum(src, dst)
+    keys, inverse = np.unique(a * len(nodes) + b, return_inverse=True)
+    similarities = np.bincount(inverse, weights=weights) / 2
+    return keys // len(nodes), keys % len(nodes), similarities
+
+
+def sparse_linkage(
+    n: int,
+    a: np.ndarray,
+    b: np.ndarray,
+    similarities: np.ndarray,
+    method: Linkage = Linkage.AVERAGE,
+) -> np.ndarray:
+    """Agglomerate ``n`` points given only their observed pair similarities.
+
+    Unobserved pairs are at distance ``1``, observed ones at ``1 - similarity``.
+    Every cluster keeps the sum, count, minimum and maximum of the observed
+    similarities to each neighbouring cluster, which is all that average,
+    single and complete linkage need. Merges are taken from a priority queue
+    of candidate distances whose stale entries are skipped, so the cost grows
+    with the number of observed pairs instead of ``n ** 2``. Clusters left
+    without observed pairs are finally joined at distance ``1``.
+
+    :return: a SciPy linkage matrix
+    """
+    method = Linkage(method)
+    size = [1] * n + [0] * max(n - 1, 0)
+    # neighbours[c][d] = [sum, count, min, max] of the similarities c-d
+    neighbours: list[dict[int, list[float]] | None] = [{} for _ in range(n)]
+    for u, v, s in zip(a.tolist(), b.tolist(), similarities.tolist()):
+        neighbours[u][v] = [s, 1, s, s]
+        neighbours[v][u] = [s, 1, s, s]
+
+    def distance(c: int, d: int, stats: list[float]) -> float:
+        total, count, low, high = stats
+        if method == Linkage.AVERAGE:
+            return 1.0 - total / (size[c] * size[d])
+        if method == Linkage.SINGLE:
+            return 1.0 - high
+        if count < size[c] * size[d]:
+            return 1.0
+        return 1.0 - low
+
+    heap = [
+        (distance(u, v, neighbours[u][v]), u, v)
+        for u in range(n)
+        for v in neighbours[u]
+        if u < v
+    ]
+    heapq.heapify(heap)
+    linkage = np.empty((max(n - 1, 0), 4), dtype=np.float64)
+    row = 0
+    while heap:
+        d, u, v = heapq.heappop(heap)
+        if neighbours[u] is None or neighbours[v] is None or d >= 1.0:
+            continue
+        c = n + row
+        size[c] = size[u] + size[v]
+        linkage[row] = (u, v, d, size[c])
+        row += 1
+        # fold the smaller neighbourhood into the larger one
+        small, large = neighbours[u], neighbours[v]
+        if len(small) > len(large):
+            small, large = large, small
+        large.pop(u, None)
+        large.pop(v, None)
+        for x, stats in small.items():
+            if x in (u, v):
+                continue
+            if x in large:
+                merged = large[x]
+                merged[0] += stats[0]
+                merged[1] += stats[1]
+                merged[2] = min(merged[2], stats[2])
+                merged[3] = max(merged[3], stats[3])
+            else:
+                large[x] = stats
+        neighbours[u] = neighbours[v] = None
+        neighbours.append(large)
+        for x, stats in large.items():
+            mirror = neighbours[x]
+            mirror.pop(u, None)
+            mirror.pop(v, None)
+            mirror[c] = stats
+            heapq.heappush(heap, (distance(x, c, stats), min(x, c), max(x, c)))
+
+    roots = [c for c in range(len(neighbours)) if neighbours[c] is not None]
+    if roots:
+        current = roots[0]
+        for root in roots[1:]:
+            c = n + row
+            size[c] = size[current] + size[root]
+            linkage[row] = (min(current, root), max(current, root), 1.0, size[c])
+            row += 1
+            current = c
+    return linkage
+
+
+class Dendrogram(Generic[T]):
+    """A merge tree over ``items`` that can be cut any number of times.
+
+    ``linkage`` is a SciPy linkage matrix whose rows are ordered by merge
+    distance, as returned by ``sparse_linkage``. Every cut applies a prefix of
+    the merges with a few vectorised passes over the ``2n - 1`` tree nodes.
+    """
+
+    def __init__(self, items: Iterable[T], linkage: np.ndarray) -> None:
+        self._items = tuple(items)
+        self._linkage = np.array(linkage, dtype=np.float64)
+        self._linkage.flags.writeable = False
+        n = len(self._items)
+        if self._linkage.shape != (max(n - 1, 0), 4):
+            raise ValueError(f"linkage over {n} items must have shape ({n - 1}, 4)")
+        # merges never undo a coarser one, so cutting by distance is a search
+        self._heights = np.maximum.accumulate(self._linkage[:, 2])
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def items(self) -> tuple[T, ...]:
+        return self._items
+
+    @property
+    def linkage(self) -> np.ndarray:
+        return self._linkage
+
+    def _cut_after(self, merges: int) -> Partition[T]:
+        n = len(self._items)
+        merges = min(max(merges, 0), n - 1) if n > 0 else 0
+        parent = np.arange(2 * n - 1 if n > 0 else 0, dtype=np.int64)
+        children = self._linkage[:merges, :2].astype(np.int64)
+        parent[children[:, 0]] = n + np.arange(merges)
+        parent[children[:, 1]] = n + np.arange(merges)
+        grandparent = parent[parent]
+        while not np.array_equal(grandparent, parent):
+            parent = grandparent
+            grandparent = parent[parent]
+        return Partition(self._items, parent[:n])
+
+    def cut(self, distance: float) -> Partition[T]:
+        """Apply every merge at no more than ``distance``.
+
+        Matches ``scipy.cluster.hierarchy.fcluster(Z, distance, "distance")``.
+        """
+        return self._cut_after(
+            int(np.searchsorted(self._heights, distance, side="right"))
+        )
+
+    def cut_k(self, k: int) -> Partition[T]:
+        """Cut the tree into ``k`` clusters, or as few as the merges allow."""
+        return self._cut_after(len(self._items) - k)
+
+    def save(self, file: str | PathLike | BinaryIO) -> None:
+        """Write the dendrogram in ``.npy`` format.
+
+        The file holds the linkage matrix, so ``numpy.load`` alone returns it,
+        followed by a second record with the items as a pickled object array.
+        """
+        items = np.empty(len(self._items), dtype=object)
+        items[:] = self._items
+        if isinstance(file, (str, PathLike)):
+            with open(file, "wb") as f:
+                self.save(f)
+            return
+        np.save(file, self._linkage)
+        np.save(file, items, allow_pickle=True)
+
+    @classmethod
+    def load(cls, file: str | PathLike | BinaryIO) -> "Dendrogram":
+        """Read a dendrogram written by ``save``.
+
+        The items are unpickled, so only load files from trusted sources.
+        """
+        if isinstance(file, (str, PathLike)):
+            with open(file, "rb") as f:
+                return cls.load(f)
+        linkage = np.load(file)
+        items = np.load(file, allow_pickle=True)
+        return cls(items.tolist(), linkage)
+
+
+def cut_linkage(
+    n: int,
+    a: np.ndarray,
+    b: np.ndarray,
+    similarities: np.ndarray,
+    method: Linkage,
+    distance: float,
+) -> np.ndarray:
+    """Labels of the ``n`` points after every merge at no more than ``distance``."""
+    Z = sparse_linkage(n, a, b, similarities, method)
+    return Dendrogram(range(n), Z).cut(distance).labels
 
 
 class HierarchicalAgglomerativeClustering(ClusteringAlgorithm[T]):
+    """Hierarchical agglomerative clustering over the observed similarities.
+
+    Pairs of references without an edge are at distance ``1``; the linkage
+    is computed from the edges alone by ``sparse_linkage``.
+
+    Clusters at a distance greater than ``max_cluster_distance`` from each
+    other only share pairs at such distances, under any of the linkages, so
+    when ``max_cluster_distance < 1`` the references are first split into
+    the connected components of the pairs within that distance. Every
+    component is clustered on its own, inline or, from ``min_parallel_size``
+    references on, in a process pool.
+
+    :param all_refs: the references to cluster
+    :param distance_function: ``scipy.spatial.distance.cdist`` metric between
+        embeddings, see ``embedding_dendrogram``
+    :param max_cluster_distance: distance at which the merge tree is cut
+    :param linkage: how the distance between clusters is computed
+    :param max_workers: process pool size, defaults to the number of CPUs
+    :param min_parallel_size: smallest component sent to the process pool
+    :param n_neighbors: neighbours linked to every embedding
+    :param block_size: embeddings whose distances are computed at once
+    """
+
     def __init__(
         self,
         all_refs: Iterable[T],
         distance_function: str = "cosine",
         max_cluster_distance: float = 1.0,
+        linkage: Linkage = Linkage.AVERAGE,
+        max_workers: int | None = None,
+        min_parallel_size: int = 1000,
+        n_neighbors: int = 10,
+        block_size: int = 1024,
     ) -> None:
         super().__init__(all_refs, 0.0)
         self._fcluster_threshold = max_cluster_distance
         self._distance_function = distance_function
-        # Average linkage natively accepts precomputed distances, unlike Ward.
-        self._linkage_method = "average"
-        self._clustering_criterion = "distance"
-
-    def _distance_matrix(self, reference_graph: ReferenceGraph) -> np.ndarray:
-        g = nx.DiGraph()
-        g.add_nodes_from(self._items)
-        g.add_weighted_edges_from(
-            itertools.starmap(
-                lambda u, v, data: (u, v, data.get("weight", 0.0)),
-                reference_graph.edges,
-            )
+        self._linkage_method = Linkage(linkage)
+        self._max_workers = max_workers
+        self._min_parallel_size = max(2, min_parallel_size)
+        self._n_neighbors = n_neighbors
+        self._block_size = block_size
+
+    def merge_tree(
+        self, reference_graph: ReferenceGraph | CsrGraph[T]
+    ) -> tuple[tuple[T, ...], np.ndarray]:
+        """Return the references and the SciPy linkage matrix over them."""
+        a, b, similarities = pair_similarities(
+            self._snapshot(reference_graph), self._items
+        )
+        Z = sparse_linkage(len(self._items), a, b, similarities, self._linkage_method)
+        return tuple(self._items), Z
+
+    def dendrogram(
+        self, reference_graph: ReferenceGraph | CsrGraph[T]
+    ) -> Dendrogram[T]:
+        """Compute the merge tree once to cut it at any number of distances."""
+        return Dendrogram(*self.merge_tree(reference_graph))
+
+    def __call__(
+        self, reference_graph: ReferenceGraph | CsrGraph[T]
+    ) -> frozenset[frozenset[T]]:
+        return self.partition(reference_graph).to_frozensets()
+
+    def partition(self, reference_graph: ReferenceGraph | CsrGraph[T]) -> Partition[T]:
+        if self._fcluster_threshold >= 1.0:
+            return self.dendrogram(reference_graph).cut(self._fcluster_threshold)
+        a, b, similarities = pair_similarities(
+            self._snapshot(reference_graph), self._items
         )
-        sim_matrix = nx.to_numpy_array(
-            g, nodelist=self._items, weight="weight"
-        ) + np.eye(len(self._items))
-
-        # Work with a symmetrized similarity matrix, then invert to get distances that
-        # HAC can consume directly; enforce zero diagonals for squareform.
-        sim_matrix = (sim_matrix + sim_matrix.T) / 2
-        distance_matrix = 1 - sim_matrix
-        np.fill_diagonal(distance_matrix, 0.0)
-        return distance_matrix
-
-    def __call__(self, reference_graph: ReferenceGraph) -> frozenset[frozenset[T]]:
-        distance_matrix = self._distance_matrix(reference_graph)
-
-        # squareform converts the symmetric matrix to the condensed vector
-        # expected by SciPy linkage when supplying distances directly.
-        condensed_distance_matrix = squareform(distance_matrix, checks=False)
-        Z = linkage(condensed_distance_matrix, method=self._linkage_method)
-
-        cluster_assignments = fcluster(
-            Z, self._fcluster_threshold, criterion=self._clustering_criterion
+        return Partition(
+            self._items, self._cut_pairs(len(self._items), a, b, similarities)
         )
 
-        unique_clusters = np.unique(cluster_assignments)
-        return frozenset(
-            frozenset(self._items[idx] for idx in np.where(cluster_assignments == c)[0])
-            for c in unique_clusters
+    def _cut_pairs(
+        self, n: int, a: np.ndarray, b: np.ndarray, similarities: np.ndarray
+    ) -> np.ndarray:
+        close = similarities >= 1.0 - self._fcluster_threshold
+        _, component = csgraph.connected_components(
+            sp.coo_array((np.ones(close.sum()), (a[close], b[close])), shape=(n, n)),
+            directed=False,
         )
+        # regroup references and their pairs by component
+        order = np.argsort(component, kind="stable")
+        sizes = np.bincount(component)
+        bounds = np.concatenate(([0], np.cumsum(sizes)))
+        local = np.empty(n, dtype=np.int64)
+        local[order] = np.arange(n) - bounds[component[order]]
+        inside = component[a] == component[b]
+        a, b, similarities = a[inside], b[inside], similarities[inside]
+        pair_order = np.argsort(component[a], kind="stable")
+        a, b, similarities = a[pair_order], b[pair_order], similarities[pair_order]
+        pair_bounds = np.searchsorted(component[a], np.arange(len(sizes) + 1))
+
+        def task(c: int) -> tuple:
+            lo, hi = pair_bounds[c], pair_bounds[c + 1]
+            return (
+                int(sizes[c]),
+                local[a[lo:hi]],
+                local[b[lo:hi]],
+                similarities[lo:hi],
+                self._linkage_method,
+                self._fcluster_threshold,
+            )
+
+        labels = np.empty(n, dtype=np.int64)
+        next_label = 0
+
+        def assign(c: int, component_labels: np.ndarray) -> None:
+            nonlocal next_label
+            labels[order[bounds[c] : bounds[c + 1]]] = next_label + component_labels
+            next_label += int(component_labels.max()) + 1
+
+        pooled = np.flatnonzero(sizes >= self._min_parallel_size).tolist()
+        executor = (
+            ProcessPoolExecutor(max_workers=self._max_workers) if pooled else None
+        )
+        try:
+            futures = {c: executor.submit(cut_linkage, *task(c)) for c in pooled}
+            for c in np.flatnonzero(sizes < self._min_parallel_size).tolist():
+                if sizes[c] == 1:
+                    assign(c, np.zeros(1, dtype=np.int64))
+                else:
+                    assign(c, cut_linkage(*task(c)))
+            for c, future in futures.items():
+                assign(c, future.result())
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return labels
+
+    def _embedding_pairs(
+        self, refs: Sequence[T], embeddings: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if len(refs) != len(embeddings):
+            raise ValueError("expected one embedding per reference")
+        if self._distance_function not in _BOUNDED_METRICS:
+            raise ValueError(
+                f"'{self._distance_function}' distances are not bounded by 1, use "
+                f"one of {', '.join(sorted(_BOUNDED_METRICS))}"
+            )
+        n = len(embeddings)
+        k = min(self._n_neighbors, n - 1)
+        if k < 1:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0)
+        rows, cols, distances = [], [], []
+        for start in range(0, n, self._block_size):
+            block = np.asarray(embeddings[start : start + self._block_size])
+            block_distances = cdist(block, embeddings, metric=self._distance_function)
+            own = np.arange(len(block))
+            block_distances[own, start + own] = np.inf
+            nearest = np.argpartition(block_distances, k - 1, axis=1)[:, :k]
+            rows.append(np.repeat(start + own, k))
+            cols.append(nearest.ravel())
+            distances.append(np.take_along_axis(block_distances, nearest, 1).ravel())
+        rows, cols = np.concatenate(rows), np.concatenate(cols)
+        a, b = np.minimum(rows, cols), np.maximum(rows, cols)
+        keys, first = np.unique(a * n + b, return_index=True)
+        similarities = np.clip(1.0 - np.concatenate(distances)[first], 0.0, 1.0)
+        return keys // n, keys % n, similarities
+
+    def embedding_dendrogram(
+        self, refs: Sequence[T], embeddings: np.ndarray
+    ) -> Dendrogram[T]:
+        """Build the merge tree of ``refs`` from their embedding vectors.
+
+        Each reference is linked to its ``n_neighbors`` nearest neighbours
+        under the ``distance_function`` metric with similarity ``1 - distance``
+        clipped to ``[0, 1]``; all other pairs are at distance ``1``. Only
+        metrics bounded by ``1``, such as ``cosine`` or ``jaccard``, are
+        accepted; others raise ``ValueError``. Distances
+        are computed ``block_size`` rows at a time, so ``embeddings`` may be a
+        memory-mapped array. Under average and complete linkage unlinked pairs
+        keep clusters apart, so ``n_neighbors`` should not be much smaller
+        than the size of the clusters sought.
+
+        :param refs: the references, in the order of the embedding rows
+        :param embeddings: one row per reference
+        """
+        a, b, similarities = self._embedding_pairs(refs, embeddings)
+        Z = sparse_linkage(len(refs), a, b, similarities, self._linkage_method)
+        return Dendrogram(refs, Z)
+
+    def partition_embeddings(
+        self, refs: Sequence[T], embeddings: np.ndarray
+    ) -> Partition[T]:
+        """Cluster ``refs`` from their embeddings, see ``embedding_dendrogram``."""
+        if self._fcluster_threshold >= 1.0:
+            return self.embedding_dendrogram(refs, embeddings).cut(
+                self._fcluster_threshold
+            )
+        a, b, similarities = self._embedding_pairs(refs, embeddings)
+        return Partition(refs, self._cut_pairs(len(refs), a, b, similarities))
@@ -2,9 +2,10 @@ from collections.abc import Iterable
 
 import igraph as ig
 import leidenalg as la
+import numpy as np
 from matchescu.similarity import ReferenceGraph
 
-from matchescu.clustering._base import T, ClusteringAlgorithm
+from matchescu.clustering._base import T, ClusteringAlgorithm, CsrGraph
 
 
 class LeidenPartitioning(ClusteringAlgorithm[T]):
@@ -17,20 +18,24 @@ class LeidenPartitioning(ClusteringAlgorithm[T]):
         super().__init__(all_refs, threshold)
         self._resolution = resolution
 
-    def _to_igraph(self, reference_graph: ReferenceGraph) -> ig.Graph:
-        idx = {n: i for i, n in enumerate(self._items)}
-        edges = [(u, v) for u, v in reference_graph.matches(self._threshold)]
+    @staticmethod
+    def _to_igraph(snapshot: CsrGraph[T]) -> ig.Graph:
+        src, dst, weights = snapshot.edges()
         graph = ig.Graph(
-            n=len(self._items),
-            edges=[(idx[u], idx[v]) for u, v in edges],
-            edge_attrs={"weight": [reference_graph.weight(u, v) for u, v in edges]},
-            directed=reference_graph.directed,
+            n=len(snapshot),
+            edges=np.column_stack((src, dst)).tolist(),
+            edge_attrs={"weight": weights.tolist()},
+            directed=snapshot.directed,
         )
         return graph
 
-    def __call__(self, reference_graph: ReferenceGraph) -> frozenset[frozenset[T]]:
-        graph = self._to_igraph(reference_graph)
+    def __call__(
+        self, reference_graph: ReferenceGraph | CsrGraph[T]
+    ) -> frozenset[frozenset[T]]:
+        snapshot = self._snapshot(reference_graph)
+        graph = self._to_igraph(snapshot)
         result = la.find_partition(graph, la.ModularityVertexPartition)
+        nodes = snapshot.nodes
         return frozenset(
-            frozenset(self._items[node] for node in cluster) for cluster in result
+            frozenset(nodes[node] for node in cluster) for cluster in result
         )
@@ -8,6 +8,8 @@ from matchescu.clustering._base import (
     ClusteringAlgorithm,
     NxDirectedMixin,
     SingletonHandlerMixin,
+    CsrGraph,
+    Partition,
 )
 
 
@@ -25,8 +27,13 @@ class LouvainPartitioning(
         self._alg_resolution = louvain_resolution
         self._alg_threshold = louvain_threshold
 
-    def __call__(self, reference_graph: ReferenceGraph) -> frozenset[frozenset[T]]:
-        graph = self._to_directed(reference_graph, self._threshold)
+    def __call__(
+        self, reference_graph: ReferenceGraph | CsrGraph[T]
+    ) -> frozenset[frozenset[T]]:
+        return self.partition(reference_graph).to_frozensets()
+
+    def partition(self, reference_graph: ReferenceGraph | CsrGraph[T]) -> Partition[T]:
+        graph = self._to_directed(self._snapshot(reference_graph))
 
         best = None
         for partition in nx_louvain.louvain_partitions(
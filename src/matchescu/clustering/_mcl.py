@@ -1,14 +1,312 @@
 from collections.abc import Iterable
 
-import markov_clustering as mc
-import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csgraph
 
 from matchescu.similarity import ReferenceGraph
 
-from matchescu.clustering._base import T, ClusteringAlgorithm
+from matchescu.clustering._base import T, ClusteringAlgorithm, CsrGraph, Partition
+from matchescu.clustering._parallel import ComponentBlocks
+
+# float64 value plus int32 row index of every stored entry
+_BYTES_PER_ENTRY = 12
+# entries of the unpruned expansion held at once when no ceiling is given
+_DEFAULT_BLOCK_ENTRIES = 1 << 24
+
+
+def _normalize_columns(matrix: sp.csc_array) -> sp.csc_array:
+    sums = np.asarray(matrix.sum(axis=0)).ravel()
+    matrix.data /= np.repeat(sums, np.diff(matrix.indptr))
+    return matrix
+
+
+def _prune(
+    matrix: sp.csc_array, threshold: float, max_per_column: int | None
+) -> sp.csc_array:
+    """Drop entries under ``threshold`` and all but the ``max_per_column``
+    largest entries of every column, always keeping the largest entry."""
+    counts = np.diff(matrix.indptr)
+    columns = np.repeat(np.arange(matrix.shape[1]), counts)
+    # rank entries within their column, largest first
+    order = np.lexsort((-matrix.data, columns))
+    rank = np.empty(matrix.nnz, dtype=np.int64)
+    rank[order] = np.arange(matrix.nnz) - np.repeat(matrix.indptr[:-1], counts)
+    keep = (matrix.data >= threshold) | (rank == 0)
+    if max_per_column is not None:
+        keep &= rank < max_per_column
+    if keep.all():
+        return matrix
+    pruned = sp.csc_array(
+        (matrix.data[keep], (matrix.indices[keep], columns[keep])),
+        shape=matrix.shape,
+    )
+    return _normalize_columns(pruned)
+
+
+def _column_blocks(
+    left: sp.csc_array, right: sp.csc_array, budget: int
+) -> list[tuple[int, int]]:
+    """Split the columns so that ``left @ right`` stays within ``budget`` per block.
+
+    Column ``j`` of the product sums at most one column of ``left`` per entry
+    of column ``j`` of ``right``, which bounds its size.
+    """
+    counts = np.diff(right.indptr)
+    columns = np.repeat(np.arange(right.shape[1]), counts)
+    bound = np.bincount(
+        columns, np.diff(left.indptr)[right.indices], minlength=right.shape[1]
+    )
+    ends = []
+    start, total = 0, np.cumsum(bound)
+    while start < right.shape[1]:
+        offset = total[start - 1] if start > 0 else 0
+        end = int(np.searchsorted(total, offset + budget, side="right"))
+        end = max(end, start + 1)
+        ends.append((start, end))
+        start = end
+    return ends
+
+
+def markov_flow(
+    matrix: sp.csc_array,
+    expansion_power: int = 2,
+    inflation_power: float = 2.0,
+    prune_threshold: float = 0.001,
+    max_per_column: int | None = 100,
+    max_iterations: int = 100,
+    tolerance: float = 1e-6,
+    max_memory: int | None = None,
+    regularizer: sp.csc_array | None = None,
+) -> sp.csc_array:
+    """Iterate MCL on a column stochastic sparse matrix until it converges.
+
+    Expansion, inflation and pruning only mix entries of the same column, so
+    every iteration runs over blocks of columns and only ever holds the flow
+    matrix plus the unpruned expansion of a single block.
+
+    :param matrix: column stochastic flow matrix
+    :param expansion_power: number of flow steps per expansion
+    :param inflation_power: exponent applied to every entry before the
+        columns are normalised again
+    :param prune_threshold: entries under this value are dropped
+    :param max_per_column: number of entries kept in every column
+    :param max_iterations: iteration limit
+    :param tolerance: the flow converged once no entry changes by more
+    :param max_memory: approximate number of bytes an iteration may use. Half
+        of it bounds the flow matrix, whose columns are pruned further when
+        they would not fit, the other half bounds the expansion of a block.
+        ``MemoryError`` is raised when even one entry per column is too much.
+    :param regularizer: column stochastic transition matrix of the graph. When
+        given, every iteration runs regularized MCL (R-MCL): the flow is
+        multiplied once by the regularizer instead of by itself, so that the
+        flow of every node becomes the weighted average of its neighbours'.
+
+    :return: the converged flow matrix
+    """
+    n = matrix.shape[0]
+    if max_memory is None:
+        kept, block_budget = None, _DEFAULT_BLOCK_ENTRIES
+    else:
+        kept = max_memory // (2 * _BYTES_PER_ENTRY)
+        block_budget = kept
+    for _ in range(max_iterations):
+        if kept is not None and matrix.nnz > kept:
+            if kept < n:
+                raise MemoryError(
+                    f"MCL on {n} nodes does not fit in {max_memory} bytes"
+                )
+            matrix = _prune(matrix, 0.0, kept // n)
+        right = matrix if regularizer is None else regularizer
+        steps = expansion_power - 1 if regularizer is None else 1
+        blocks = []
+        for start, end in _column_blocks(matrix, right, block_budget):
+            block = right[:, start:end]
+            for _ in range(steps):
+                block = matrix @ block
+            block = sp.csc_array(block)
+            block.data **= inflation_power
+            blocks.append(
+                _prune(_normalize_columns(block), prune_threshold, max_per_column)
+            )
+        expanded = sp.csc_array(sp.hstack(blocks, format="csc"))
+        delta = abs(expanded - matrix)
+        matrix = expanded
+        if delta.nnz == 0 or delta.max() <= tolerance:
+            break
+    return matrix
+
+
+def _heavy_edge_matching(adjacency: sp.csr_array, rounds: int = 4) -> np.ndarray:
+    """Pair nodes with their heaviest neighbour when the choice is mutual.
+
+    :return: the coarse node of every node
+    """
+    n = adjacency.shape[0]
+    coo = adjacency.tocoo()
+    off_diagonal = coo.row != coo.col
+    rows, cols = coo.row[off_diagonal], coo.col[off_diagonal]
+    weights = coo.data[off_diagonal]
+    mate = np.full(n, -1, dtype=np.int64)
+    for _ in range(rounds):
+        free = (mate[rows] < 0) & (mate[cols] < 0)
+        rows, cols, weights = rows[free], cols[free], weights[free]
+        if rows.size == 0:
+            break
+        order = np.lexsort((cols, -weights, rows))
+        first = order[np.r_[True, rows[order][1:] != rows[order][:-1]]]
+        choice = np.full(n, -1, dtype=np.int64)
+        choice[rows[first]] = cols[first]
+        chosen = np.flatnonzero(choice >= 0)
+        mutual = chosen[choice[choice[chosen]] == chosen]
+        mate[mutual] = choice[mutual]
+    # the smaller node of every pair names the coarse node
+    leader = np.where((mate < 0) | (np.arange(n) < mate), np.arange(n), mate)
+    return np.unique(leader, return_inverse=True)[1]
+
+
+def _transition_matrix(adjacency: sp.csc_array) -> sp.csc_array:
+    n = adjacency.shape[0]
+    matrix = sp.csc_array(adjacency + sp.eye_array(n, format="csc"))
+    matrix.sum_duplicates()
+    return _normalize_columns(matrix)
+
+
+def multilevel_markov_flow(
+    adjacency: sp.csc_array,
+    coarse_size: int = 1000,
+    iterations_per_level: int = 5,
+    inflation_power: float = 2.0,
+    prune_threshold: float = 0.001,
+    max_per_column: int | None = 100,
+    max_iterations: int = 100,
+    tolerance: float = 1e-6,
+    max_memory: int | None = None,
+) -> sp.csc_array:
+    """Multi-level regularized MCL (MLR-MCL).
+
+    The symmetrised graph is coarsened by heavy edge matching until it has at
+    most ``coarse_size`` nodes or stops shrinking. R-MCL runs for
+    ``iterations_per_level`` iterations on every level, starting from the
+    coarsest. The flow is then projected to the next finer level: every node
+    inherits the flow of its coarse node, and flow into a coarse node is split
+    evenly between the nodes it merged. On the original graph, R-MCL runs
+    until it converges.
+
+    :param adjacency: weighted adjacency matrix with a column per source
+    :return: the converged flow matrix of the original graph
+    """
+    levels = [adjacency]
+    parents = []
+    symmetric = adjacency + adjacency.T
+    while symmetric.shape[0] > coarse_size:
+        parent = _heavy_edge_matching(sp.csr_array(symmetric))
+        coarse = int(parent.max()) + 1
+        if coarse > 0.9 * symmetric.shape[0]:
+            break
+        assignment = sp.csc_array(
+            (np.ones(len(parent)), (np.arange(len(parent)), parent)),
+            shape=(len(parent), coarse),
+        )
+        levels.append(sp.csc_array(assignment.T @ levels[-1] @ assignment))
+        symmetric = assignment.T @ symmetric @ assignment
+        parents.append(assignment)
+
+    flow = _transition_matrix(levels[-1])
+    for level in range(len(levels) - 1, -1, -1):
+        last = level == 0
+        flow = markov_flow(
+            flow,
+            inflation_power=inflation_power,
+            prune_threshold=prune_threshold,
+            max_per_column=max_per_column,
+            max_iterations=max_iterations if last else iterations_per_level,
+            tolerance=tolerance,
+            max_memory=max_memory,
+            regularizer=_transition_matrix(levels[level]),
+        )
+        if not last:
+            assignment = parents[level - 1]
+            split = _normalize_columns(assignment.copy())
+            flow = sp.csc_array(split @ flow @ assignment.T)
+    return flow
+
+
+def _prune_dense(
+    stack: np.ndarray, threshold: float, max_per_column: int | None
+) -> np.ndarray:
+    size = stack.shape[1]
+    order = np.argsort(-stack, axis=1, kind="stable")
+    rank = np.empty_like(order)
+    np.put_along_axis(
+        rank, order, np.broadcast_to(np.arange(size)[:, None], order.shape), axis=1
+    )
+    keep = (stack >= threshold) | (rank == 0)
+    if max_per_column is not None:
+        keep &= rank < max_per_column
+    if keep.all():
+        return stack
+    stack = np.where(keep, stack, 0.0)
+    return stack / stack.sum(axis=1, keepdims=True)
+
+
+def dense_markov_flow(
+    stack: np.ndarray,
+    expansion_power: int = 2,
+    inflation_power: float = 2.0,
+    prune_threshold: float = 0.001,
+    max_per_column: int | None = 100,
+    max_iterations: int = 100,
+    tolerance: float = 1e-6,
+) -> np.ndarray:
+    """Iterate MCL on a stack of column stochastic matrices of equal size.
+
+    Every matrix takes the same steps as in ``markov_flow``; matrices drop out
+    of the batch as soon as they converge.
+    """
+    stack = np.array(stack, dtype=np.float64)
+    active = np.arange(len(stack))
+    for _ in range(max_iterations):
+        if active.size == 0:
+            break
+        current = stack[active]
+        expanded = np.linalg.matrix_power(current, expansion_power)
+        expanded **= inflation_power
+        expanded /= expanded.sum(axis=1, keepdims=True)
+        expanded = _prune_dense(expanded, prune_threshold, max_per_column)
+        stack[active] = expanded
+        delta = np.abs(expanded - current).max(axis=(1, 2))
+        active = active[delta > tolerance]
+    return stack
 
 
 class MarkovClustering(ClusteringAlgorithm[T]):
+    """Markov clustering (MCL) on sparse flow matrices.
+
+    Clusters are the connected components of the converged flow, so every
+    node belongs to exactly one cluster. Flow never leaves a weakly connected
+    component, so every component is clustered on its own: isolated nodes
+    are singletons, components of up to ``dense_max_size`` nodes are batched
+    by size into stacks of small dense matrices and larger ones run through
+    the sparse engine.
+
+    :param all_refs: the references to cluster
+    :param threshold: minimum weight of a match
+    :param inflation_power: MCL inflation
+    :param expansion_power: MCL expansion
+    :param prune_threshold: flow under this value is dropped after inflation
+    :param max_per_column: flow entries kept for every node after inflation
+    :param max_iterations: iteration limit
+    :param max_memory: approximate number of bytes an iteration may use
+    :param dense_max_size: largest component clustered with dense matrices
+    :param multilevel: cluster the components larger than ``dense_max_size``
+        with multi-level regularized MCL (MLR-MCL), which needs far fewer
+        products of large sparse matrices and fragments long chains less.
+        Nodes then join the node that attracts most of their flow.
+    :param coarse_size: MLR-MCL stops coarsening at this many nodes
+    :param iterations_per_level: R-MCL iterations on every coarse level
+    """
+
     def __init__(
         self,
         all_refs: Iterable[T],
@@ -16,38 +314,135 @@ class MarkovClustering(ClusteringAlgorithm[T]):
         inflation_power: float = 2.0,
         expansion_power: int = 2,
         prune_threshold: float = 0.001,
+        max_per_column: int | None = 100,
+        max_iterations: int = 100,
+        max_memory: int | None = None,
+        dense_max_size: int = 64,
+        multilevel: bool = False,
+        coarse_size: int = 1000,
+        iterations_per_level: int = 5,
     ):
         super().__init__(all_refs, threshold)
-        self._item_to_index = {item: idx for idx, item in enumerate(self._items)}
         self._expansion_power = expansion_power
         self._inflation_power = inflation_power
         self._prune_threshold = prune_threshold
+        self._max_per_column = max_per_column
+        self._max_iterations = max_iterations
+        self._max_memory = max_memory
+        self._dense_max_size = dense_max_size
+        self._multilevel = multilevel
+        self._coarse_size = coarse_size
+        self._iterations_per_level = iterations_per_level
+
+    @staticmethod
+    def _adjacency(graph: CsrGraph[T]) -> sp.csc_array:
+        n = len(graph)
+        src, dst, weights = graph.edges()
+        weights = np.clip(weights, 0.0, None)
+        if not graph.directed:
+            src, dst = np.concatenate((src, dst)), np.concatenate((dst, src))
+            weights = np.concatenate((weights, weights))
+        return sp.csc_array((weights, (src, dst)), shape=(n, n))
 
-    def __call__(self, reference_graph: ReferenceGraph) -> frozenset[frozenset[T]]:
-        g = nx.DiGraph()
+    def __call__(
+        self, reference_graph: ReferenceGraph | CsrGraph[T]
+    ) -> frozenset[frozenset[T]]:
+        return self.partition(reference_graph).to_frozensets()
 
-        for u, v in reference_graph.matches(self._threshold):
-            g.add_edge(u, v, weight=reference_graph.weight(u, v))
+    def _sparse_labels(self, graph: CsrGraph[T]) -> np.ndarray:
+        if self._multilevel:
+            flow = multilevel_markov_flow(
+                self._adjacency(graph),
+                self._coarse_size,
+                self._iterations_per_level,
+                self._inflation_power,
+                self._prune_threshold,
+                self._max_per_column,
+                self._max_iterations,
+                max_memory=self._max_memory,
+            )
+            # regularized flow keeps small cross-cluster entries, so every
+            # node joins the node most of its flow ends up in
+            return np.asarray(flow.argmax(axis=0)).ravel()
+        flow = markov_flow(
+            _transition_matrix(self._adjacency(graph)),
+            self._expansion_power,
+            self._inflation_power,
+            self._prune_threshold,
+            self._max_per_column,
+            self._max_iterations,
+            max_memory=self._max_memory,
+        )
+        return csgraph.connected_components(flow, directed=False)[1]
 
-        linked_ref_ids = list(g.nodes)
-        adj_matrix = nx.to_numpy_array(g, weight="weight")
-        adj_matrix[adj_matrix < 0] = 0
+    def _dense_labels(
+        self, blocks: ComponentBlocks, components: np.ndarray, size: int
+    ) -> np.ndarray:
+        """Cluster equally sized components; labels are local to each one."""
+        starts = blocks.bounds[components]
+        edge_starts = blocks.indptr[starts]
+        degrees = np.diff(blocks.indptr)[starts[:, None] + np.arange(size)]
+        # matrix, local row and local column of every edge of the batch
+        counts = degrees.sum(axis=1)
+        batch = np.repeat(np.arange(len(components)), counts)
+        rows = np.repeat(np.tile(np.arange(size), len(components)), degrees.ravel())
+        first = np.repeat(edge_starts - np.cumsum(counts) + counts, counts)
+        positions = first + np.arange(counts.sum())
+        cols = blocks.indices[positions].astype(np.int64)
+        weights = np.clip(blocks.weights[positions], 0.0, None)
 
-        result = mc.run_mcl(
-            adj_matrix,
+        stack = np.zeros((len(components), size, size))
+        np.add.at(stack, (batch, rows, cols), weights)
+        if not blocks.directed:
+            np.add.at(stack, (batch, cols, rows), weights)
+        stack += np.eye(size)
+        stack /= stack.sum(axis=1, keepdims=True)
+        flow = dense_markov_flow(
+            stack,
             self._expansion_power,
             self._inflation_power,
-            pruning_threshold=self._prune_threshold,
+            self._prune_threshold,
+            self._max_per_column,
+            self._max_iterations,
         )
-        cluster_indices = mc.get_clusters(result)
-
-        singletons = set(self._items) - set(linked_ref_ids)
-        clusters = set()
-        for c in cluster_indices:
-            cluster = frozenset(linked_ref_ids[idx] for idx in c)
-            singletons.difference_update(cluster)
-            clusters.add(cluster)
-        for singleton in singletons:
-            clusters.add(frozenset([singleton]))
-
-        return frozenset(clusters)
+        # the converged matrices are the diagonal blocks of a single graph
+        batch, rows, cols = np.nonzero(flow)
+        offset = batch * size
+        linked = sp.coo_array(
+            (np.ones(len(batch)), (offset + rows, offset + cols)),
+            shape=(len(components) * size, len(components) * size),
+        )
+        _, labels = csgraph.connected_components(linked, directed=False)
+        return labels.reshape(len(components), size)
+
+    def partition(self, reference_graph: ReferenceGraph | CsrGraph[T]) -> Partition[T]:
+        graph = self._snapshot(reference_graph)
+        blocks = ComponentBlocks(graph, graph.connected_components("weak"))
+        sizes = blocks.sizes()
+        # every block starts out as a single cluster; singletons stay that way
+        labels = np.repeat(np.arange(len(blocks), dtype=np.int64), sizes)
+        next_label = len(blocks)
+
+        dense = (sizes > 1) & (sizes <= self._dense_max_size)
+        budget = (
+            _DEFAULT_BLOCK_ENTRIES
+            if self._max_memory is None
+            else self._max_memory // (2 * _BYTES_PER_ENTRY)
+        )
+        for size in np.unique(sizes[dense]).tolist():
+            same_size = np.flatnonzero(sizes == size)
+            per_batch = max(1, budget // (size * size))
+            for lo in range(0, len(same_size), per_batch):
+                components = same_size[lo : lo + per_batch]
+                component_labels = self._dense_labels(blocks, components, size)
+                for component, local in zip(components.tolist(), component_labels):
+                    start = blocks.bounds[component]
+                    labels[start : start + size] = next_label + local
+                next_label += int(component_labels.max()) + 1
+
+        for component in np.flatnonzero(sizes > self._dense_max_size).tolist():
+            local = self._sparse_labels(blocks.block(component))
+            start, end = blocks.bounds[component], blocks.bounds[component + 1]
+            labels[start:end] = next_label + local
+            next_label += int(local.max()) + 1
+        return Partition(blocks.nodes, labels)
@@ -0,0 +1,331 @@
+import atexit
+from collections.abc import Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from enum import StrEnum
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from matchescu.similarity import ReferenceGraph
+
+from matchescu.clustering._base import T, ClusteringAlgorithm, CsrGraph, Partition
+
+AlgorithmFactory = Callable[[Iterable[T]], ClusteringAlgorithm[T]]
+ArraySpec = dict[str, tuple[str, tuple[int, ...], str]]
+
+
+class Transport(StrEnum):
+    PICKLE = "pickle"
+    SHARED_MEMORY = "shared_memory"
+
+
+class ComponentBlocks:
+    """Snapshot rows regrouped so that every component is a contiguous block.
+
+    Column indexes are stored relative to the first row of their block, so a
+    component's CSR arrays are plain slices of the shared arrays.
+    """
+
+    def __init__(self, graph: CsrGraph[T], labels: np.ndarray) -> None:
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels)
+        self.bounds = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.bounds[1:])
+        position = np.empty(len(order), dtype=np.int64)
+        position[order] = np.arange(len(order))
+        src, dst, weights = graph.edges()
+        regrouped = CsrGraph.from_edges(
+            [graph.nodes[idx] for idx in order.tolist()],
+            position[src],
+            position[dst],
+            weights,
+            graph.directed,
+            graph.threshold,
+        )
+        self.nodes = regrouped.nodes
+        self.indptr = regrouped.indptr
+        self.weights = regrouped.weights
+        block_start = np.repeat(self.bounds[:-1], counts)
+        self.indices = (regrouped.indices - block_start[regrouped.sources()]).astype(
+            regrouped.indices.dtype
+        )
+        self.directed = graph.directed
+        self.threshold = graph.threshold
+
+    def __len__(self) -> int:
+        return len(self.bounds) - 1
+
+    def sizes(self) -> np.ndarray:
+        return np.diff(self.bounds)
+
+    def edge_counts(self) -> np.ndarray:
+        return np.diff(self.indptr[self.bounds])
+
+    def block(self, component: int) -> CsrGraph[T]:
+        return component_graph(
+            self.nodes,
+            self.indptr,
+            self.indices,
+            self.weights,
+            int(self.bounds[component]),
+            int(self.bounds[component + 1]),
+            self.directed,
+            self.threshold,
+        )
+
+
+class SharedArrays:
+    """Copies of numpy arrays placed in named ``multiprocessing`` shared memory.
+
+    ``spec`` is a small picklable description of the segments that other
+    processes pass to ``attach_shared`` to map the arrays without copying them.
+    The owner unlinks the segments on ``close``.
+    """
+
+    def __init__(self, **arrays: np.ndarray) -> None:
+        self._segments: list[SharedMemory] = []
+        self.spec: ArraySpec = {}
+        try:
+            for key, array in arrays.items():
+                array = np.ascontiguousarray(array)
+                segment = SharedMemory(create=True, size=max(array.nbytes, 1))
+                self._segments.append(segment)
+                view = np.ndarray(array.shape, array.dtype, buffer=segment.buf)
+                view[...] = array
+                del view
+                self.spec[key] = (segment.name, array.shape, array.dtype.str)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        for segment in self._segments:
+            segment.close()
+            segment.unlink()
+        self._segments.clear()
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+# segments attached by this process, kept open until ``detach_shared``
+_attached: dict[str, SharedMemory] = {}
+_shared_blocks: dict[str, np.ndarray] = {}
+_detach_registered = False
+
+
+def attach_shared(spec: ArraySpec) -> dict[str, np.ndarray]:
+    """Map the arrays described by ``spec`` as read-only views."""
+    arrays = {}
+    for key, (name, shape, dtype) in spec.items():
+        segment = _attached.get(name)
+        if segment is None:
+            segment = _attached[name] = SharedMemory(name=name)
+        view = np.ndarray(shape, np.dtype(dtype), buffer=segment.buf)
+        view.flags.writeable = False
+        arrays[key] = view
+    return arrays
+
+
+def detach_shared() -> None:
+    """Close every segment attached by this process.
+
+    Segments still referenced by views outside this module stay open.
+    """
+    _shared_blocks.clear()
+    for name, segment in list(_attached.items()):
+        try:
+            segment.close()
+        except BufferError:
+            continue
+        del _attached[name]
+
+
+def _init_shared_worker(spec: ArraySpec) -> None:
+    global _detach_registered
+    # segments of an earlier spec are no longer needed by this worker
+    if any(name not in _attached for name, _, _ in spec.values()):
+        detach_shared()
+    _shared_blocks.clear()
+    _shared_blocks.update(attach_shared(spec))
+    if not _detach_registered:
+        atexit.register(detach_shared)
+        _detach_registered = True
+
+
+def component_graph(
+    nodes: tuple[T, ...],
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    weights: np.ndarray,
+    start: int,
+    end: int,
+    directed: bool,
+    threshold: float,
+) -> CsrGraph[T]:
+    lo, hi = indptr[start], indptr[end]
+    return CsrGraph(
+        nodes[start:end],
+        indptr[start : end + 1] - lo,
+        indices[lo:hi],
+        weights[lo:hi],
+        directed,
+        threshold,
+    )
+
+
+def cluster_component(factory: AlgorithmFactory, graph: CsrGraph[T]) -> np.ndarray:
+    """Cluster one component and return labels aligned with ``graph.nodes``."""
+    partition = factory(graph.nodes).partition(graph)
+    return partition.labels[partition.index_array(graph.nodes)]
+
+
+def cluster_shared_component(
+    factory: AlgorithmFactory,
+    nodes: tuple[T, ...],
+    start: int,
+    end: int,
+    directed: bool,
+    threshold: float,
+) -> np.ndarray:
+    """Cluster rows ``[start, end)`` of the blocks shared with this worker.
+
+    Only the component's nodes travel with the task; the edge arrays are
+    slices of the shared memory mapped when the worker started.
+    """
+    graph = component_graph(
+        nodes,
+        _shared_blocks["indptr"][start : end + 1],
+        _shared_blocks["indices"],
+        _shared_blocks["weights"],
+        0,
+        end - start,
+        directed,
+        threshold,
+    )
+    return cluster_component(factory, graph)
+
+
+class ParallelComponentClustering(ClusteringAlgorithm[T]):
+    """Run a clustering algorithm separately on every weakly connected component.
+
+    Components with a single node are singletons. Components smaller than
+    ``min_parallel_size`` are clustered inline; the others are dispatched to a
+    process pool, largest first, and the results are merged into a single
+    partition. Only use this with algorithms whose result on a component does
+    not depend on the rest of the graph, and with a ``threshold`` no stricter
+    than the one the wrapped algorithm applies.
+
+    :param all_refs: the references to cluster
+    :param algorithm_factory: picklable callable building the wrapped
+        algorithm from the references of one component, e.g.
+        ``functools.partial(MarkovClustering, threshold=0.8)``
+    :param threshold: minimum weight of the edges that connect components
+    :param max_workers: process pool size, defaults to the number of CPUs
+    :param min_parallel_size: smallest component sent to the process pool
+    :param transport: how pooled components reach the workers. ``PICKLE``
+        serializes every component graph. ``SHARED_MEMORY`` copies the edge
+        arrays of all components to shared memory once; workers map them
+        read-only and only receive the nodes of their component.
+    """
+
+    def __init__(
+        self,
+        all_refs: Iterable[T],
+        algorithm_factory: AlgorithmFactory,
+        threshold: float = 0.75,
+        max_workers: int | None = None,
+        min_parallel_size: int = 1000,
+        transport: Transport = Transport.PICKLE,
+    ) -> None:
+        super().__init__(all_refs, threshold)
+        self._factory = algorithm_factory
+        self._max_workers = max_workers
+        self._min_parallel_size = max(2, min_parallel_size)
+        self._transport = Transport(transport)
+
+    def _schedule(self, blocks: ComponentBlocks) -> tuple[np.ndarray, np.ndarray]:
+        sizes = blocks.sizes()
+        inline = np.flatnonzero((sizes > 1) & (sizes < self._min_parallel_size))
+        pooled = np.flatnonzero(sizes >= self._min_parallel_size)
+        # longest processing time first keeps the pool busy until the end
+        work = sizes[pooled] + blocks.edge_counts()[pooled]
+        return inline, pooled[np.argsort(-work, kind="stable")]
+
+    def _cluster(self, blocks: ComponentBlocks, component: int) -> np.ndarray:
+        return cluster_component(self._factory, blocks.block(component))
+
+    def _submit(
+        self, executor: ProcessPoolExecutor, blocks: ComponentBlocks, component: int
+    ):
+        if self._transport == Transport.PICKLE:
+            return executor.submit(
+                cluster_component, self._factory, blocks.block(component)
+            )
+        start, end = int(blocks.bounds[component]), int(blocks.bounds[component + 1])
+        return executor.submit(
+            cluster_shared_component,
+            self._factory,
+            blocks.nodes[start:end],
+            start,
+            end,
+            blocks.directed,
+            blocks.threshold,
+        )
+
+    def __call__(
+        self, similarity_graph: ReferenceGraph | CsrGraph[T]
+    ) -> frozenset[frozenset[T]]:
+        return self.partition(similarity_graph).to_frozensets()
+
+    def partition(self, similarity_graph: ReferenceGraph | CsrGraph[T]) -> Partition[T]:
+        graph = self._snapshot(similarity_graph)
+        blocks = ComponentBlocks(graph, graph.connected_components("weak"))
+        inline, pooled = self._schedule(blocks)
+
+        # every block starts out as a single cluster; singletons stay that way
+        labels = np.repeat(np.arange(len(blocks), dtype=np.int64), blocks.sizes())
+        next_label = len(blocks)
+
+        def assign(component: int, component_labels: np.ndarray) -> None:
+            nonlocal next_label
+            start, end = blocks.bounds[component], blocks.bounds[component + 1]
+            labels[start:end] = next_label + component_labels
+            next_label += int(component_labels.max()) + 1
+
+        if len(pooled) == 0:
+            for component in inline.tolist():
+                assign(component, self._cluster(blocks, component))
+            return Partition(blocks.nodes, labels)
+
+        if self._transport == Transport.SHARED_MEMORY:
+            shared = SharedArrays(
+                indptr=blocks.indptr, indices=blocks.indices, weights=blocks.weights
+            )
+            executor = ProcessPoolExecutor(
+                max_workers=self._max_workers,
+                initializer=_init_shared_worker,
+                initargs=(shared.spec,),
+            )
+        else:
+            shared = None
+            executor = ProcessPoolExecutor(max_workers=self._max_workers)
+
+        try:
+            with executor:
+                futures = {
+                    component: self._submit(executor, blocks, component)
+                    for component in pooled.tolist()
+                }
+                # small components are clustered here while the pool is busy
+                for component in inline.tolist():
+                    assign(component, self._cluster(blocks, component))
+                for component, future in futures.items():
+                    assign(component, future.result())
+        finally:
+            if shared is not None:
+                shared.close()
+        return Partition(blocks.nodes, labels)
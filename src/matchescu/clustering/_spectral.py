@@ -1,23 +1,283 @@
-from typing import Iterable
+import warnings
+from enum import StrEnum
+from typing import Iterable, NamedTuple
 
 import networkx as nx
 import numpy as np
+import scipy.linalg as linalg
 import scipy.sparse as sp
 import scipy.sparse.linalg as sp_linalg
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 
 from matchescu.clustering._base import (
     ClusteringAlgorithm,
     T,
     NxDirectedMixin,
     SingletonHandlerMixin,
+    CsrGraph,
+    Partition,
 )
+from matchescu.clustering._stationary import StationaryMethod, StationarySolver
 from matchescu.similarity import ReferenceGraph
 
 
+class Eigensolver(StrEnum):
+    """Backend computing the smallest eigenpairs of the Laplacian."""
+
+    AUTO = "auto"
+    DENSE = "dense"
+    ARPACK = "arpack"
+    LOBPCG = "lobpcg"
+
+
+class KMeansMethod(StrEnum):
+    """Algorithm assigning the embedded nodes to clusters."""
+
+    LLOYD = "lloyd"
+    MINIBATCH = "minibatch"
+
+
+class KMeansInit(StrEnum):
+    """How the first centroids of the assignment stage are chosen."""
+
+    KMEANS_PLUSPLUS = "k-means++"
+    PIVOTED_QR = "pivoted_qr"
+
+
+class KMeansStats(NamedTuple):
+    """Outcome of the assignment stage on one component."""
+
+    size: int
+    clusters: int
+    inertia: float
+    iterations: int
+
+
+# the Laplacian is singular, so shift-invert factorizes L - sigma * I instead
+_SHIFT = -1e-3
+_LOBPCG_MAX_RESIDUAL = 1e-2
+
+
+def _lobpcg_preconditioner(laplacian: sp.csr_array):
+    """Algebraic multigrid preconditioner if ``pyamg`` is installed, else Jacobi."""
+    shifted = sp.csr_array(laplacian - _SHIFT * sp.eye(laplacian.shape[0]))
+    try:
+        import pyamg
+    except ImportError:
+        return sp.diags(1.0 / shifted.diagonal())
+    return pyamg.smoothed_aggregation_solver(shifted).aspreconditioner()
+
+
+def smallest_eigenpairs(
+    laplacian: sp.csr_array,
+    k: int,
+    solver: Eigensolver = Eigensolver.DENSE,
+    random_state: int | None = None,
+    max_iterations: int = 500,
+    initial: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return the ``k`` smallest eigenvalues of ``laplacian`` and their eigenvectors.
+
+    Eigenvalues are ascending and eigenvectors are the matching columns.
+
+    :param laplacian: a symmetric positive semi-definite matrix
+    :param k: number of eigenpairs, clipped to the matrix size
+    :param solver: ``DENSE`` runs ``eigh`` on the dense matrix. ``ARPACK``
+        factorizes ``laplacian`` once and runs in shift-invert mode.
+        ``LOBPCG`` only needs matrix products and uses an algebraic multigrid
+        preconditioner when ``pyamg`` is installed, Jacobi otherwise. It needs
+        ``5 * k`` to stay below the matrix size. The sparse solvers warn and
+        fall back to ``DENSE`` when ``k`` is too large for them, and ``LOBPCG``
+        warns and falls back to ``ARPACK`` when it does not converge.
+    :param random_state: seed of the ``LOBPCG`` starting block
+    :param max_iterations: iteration limit of the ``LOBPCG`` solver
+    :param initial: approximate eigenvectors warm-starting the first columns of
+        the ``LOBPCG`` block
+    """
+    n = laplacian.shape[0]
+    k = min(k, n)
+    if solver == Eigensolver.LOBPCG and 5 * k < n:
+        laplacian = sp.csr_array(laplacian)
+        start = np.random.default_rng(random_state).standard_normal((n, k))
+        if initial is not None:
+            start[:, : initial.shape[1]] = initial[:, :k]
+        with warnings.catch_warnings():
+            # convergence is checked below through the residuals
+            warnings.simplefilter("ignore", UserWarning)
+            eigenvalues, eigenvectors = sp_linalg.lobpcg(
+                laplacian,
+                start,
+                M=_lobpcg_preconditioner(laplacian),
+                largest=False,
+                maxiter=max_iterations,
+            )
+        residuals = laplacian @ eigenvectors - eigenvectors * eigenvalues
+        if np.linalg.norm(residuals, axis=0).max() <= _LOBPCG_MAX_RESIDUAL:
+            order = np.argsort(eigenvalues)
+            return eigenvalues[order], eigenvectors[:, order]
+        # LOBPCG breaks down on highly degenerate spectra
+        warnings.warn(
+            "LOBPCG did not converge, falling back to ARPACK", RuntimeWarning, 2
+        )
+        solver = Eigensolver.ARPACK
+    elif solver == Eigensolver.LOBPCG:
+        warnings.warn(
+            f"{k} eigenpairs are too many for LOBPCG on {n} nodes, "
+            "falling back to the dense solver",
+            RuntimeWarning,
+            2,
+        )
+    if solver == Eigensolver.ARPACK and k < n - 1:
+        eigenvalues, eigenvectors = sp_linalg.eigsh(
+            sp.csc_array(laplacian), k=k, sigma=_SHIFT, which="LM"
+        )
+        order = np.argsort(eigenvalues)
+        return eigenvalues[order], eigenvectors[:, order]
+    if solver == Eigensolver.ARPACK:
+        warnings.warn(
+            f"{k} eigenpairs are too many for ARPACK on {n} nodes, "
+            "falling back to the dense solver",
+            RuntimeWarning,
+            2,
+        )
+    dense = laplacian.toarray() if sp.issparse(laplacian) else laplacian
+    return linalg.eigh(dense, subset_by_index=[0, k - 1])
+
+
+def has_clear_eigengap(eigenvalues: np.ndarray, ratio: float) -> bool:
+    """Tell whether the largest gap after the first stands out among the others.
+
+    The gap must be at least ``ratio`` times the median of the remaining gaps
+    and must not be the last one, which could still grow with more eigenvalues.
+    """
+    gaps = np.diff(eigenvalues)[1:]
+    if gaps.size < 3:
+        return False
+    best = int(np.argmax(gaps))
+    if best == gaps.size - 1:
+        return False
+    baseline = np.median(np.delete(gaps, best))
+    return bool(gaps[best] > ratio * max(baseline, np.finfo(np.float64).eps))
+
+
+def batched_kmeans(
+    points: np.ndarray,
+    k: int,
+    rng: np.random.Generator,
+    max_iterations: int = 300,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Run k-means on a stack of equally sized point sets at once.
+
+    Centroids are seeded with k-means++ and refined with Lloyd iterations
+    until no assignment changes. Empty clusters keep their centroid.
+
+    :param points: ``(batch, n, d)`` array
+    :param k: number of clusters of every point set
+    :param rng: random generator drawing the seeds
+    :param max_iterations: limit of Lloyd iterations
+    :return: the ``(batch, n)`` labels, the ``(batch,)`` inertias and the
+        number of Lloyd iterations run
+    """
+    batch, n, _ = points.shape
+    rows = np.arange(batch)
+    centroids = np.empty((batch, k, points.shape[2]))
+    centroids[:, 0] = points[rows, rng.integers(0, n, batch)]
+    closest = ((points - centroids[:, :1]) ** 2).sum(axis=2)
+    for j in range(1, k):
+        totals = closest.sum(axis=1, keepdims=True)
+        weights = np.where(totals > 0, closest / np.where(totals > 0, totals, 1), 1 / n)
+        picks = (rng.random((batch, 1)) < weights.cumsum(axis=1)).argmax(axis=1)
+        centroids[:, j] = points[rows, picks]
+        closest = np.minimum(
+            closest, ((points - centroids[:, j : j + 1]) ** 2).sum(axis=2)
+        )
+
+    labels = np.full((batch, n), -1)
+    iterations = 0
+    for iterations in range(1, max_iterations + 1):
+        distances = ((points[:, :, None] - centroids[:, None]) ** 2).sum(axis=3)
+        assigned = distances.argmin(axis=2)
+        if np.array_equal(assigned, labels):
+            break
+        labels = assigned
+        members = (labels[:, :, None] == np.arange(k)).astype(np.float64)
+        counts = members.sum(axis=1)[:, :, None]
+        sums = np.swapaxes(members, 1, 2) @ points
+        centroids = np.where(counts > 0, sums / np.maximum(counts, 1), centroids)
+    distances = ((points[:, :, None] - centroids[:, None]) ** 2).sum(axis=3)
+    inertias = np.take_along_axis(distances, labels[:, :, None], 2).sum(axis=(1, 2))
+    return labels, inertias, iterations
+
+
+def normalize_signs(eigenvectors: np.ndarray) -> np.ndarray:
+    """Flip every eigenvector so that its largest-magnitude entry is positive.
+
+    Eigensolvers return eigenvectors up to sign, so this makes the embedding
+    of the same graph comparable across solvers and calls.
+    """
+    columns = np.arange(eigenvectors.shape[1])
+    largest = eigenvectors[np.abs(eigenvectors).argmax(axis=0), columns]
+    return eigenvectors * np.where(largest < 0, -1.0, 1.0)
+
+
+def pivoted_qr_seeds(embedding: np.ndarray, k: int) -> np.ndarray:
+    """Pick ``k`` embedded nodes as seeds with a column-pivoted QR.
+
+    The pivots are the nodes spanning the embedding best, which tend to lie
+    in different clusters.
+    """
+    _, _, pivots = linalg.qr(embedding.T, mode="economic", pivoting=True)
+    return embedding[pivots[:k]]
+
+
 class SpectralClustering(
     ClusteringAlgorithm[T], SingletonHandlerMixin[T], NxDirectedMixin
 ):
+    """Spectral clustering over the random walk Laplacian.
+
+    :param eigensolver: backend computing the Laplacian's eigenvectors.
+        ``AUTO`` picks ``DENSE`` for graphs of at most ``dense_max_size`` nodes,
+        ``LOBPCG`` from ``lobpcg_min_size`` nodes onward and shift-invert
+        ``ARPACK`` in between. ``LOBPCG`` computes at most a fifth as many
+        eigenpairs as there are nodes, searching them by ``adaptive_eigengap``
+        blocks when more clusters are allowed.
+    :param dense_max_size: largest graph handed to the dense solver by ``AUTO``
+    :param lobpcg_min_size: smallest graph handed to ``LOBPCG`` by ``AUTO``
+    :param adaptive_eigengap: compute eigenpairs in blocks of doubling size,
+        starting from ``eigengap_block``, until a clear eigengap appears instead
+        of computing all ``max_cluster_count`` of them up front. Each block
+        warm-starts ``LOBPCG`` with the previous eigenvectors.
+    :param eigengap_block: size of the first block of eigenpairs
+    :param eigengap_ratio: how many times larger than the median gap the
+        eigengap must be to stop early
+    :param batch_small_components: cluster the components of at most
+        ``batch_max_size`` nodes together, grouped by size. Each group's
+        Laplacians are stacked into one dense tensor, solved with a single
+        batched ``eigh`` and embedded with a batched k-means, trading the
+        eigensolver and k-means options for far less per-component overhead.
+    :param batch_max_size: largest component handled by the batched path
+    :param kmeans: ``LLOYD`` runs ``KMeans`` on every embedding,
+        ``MINIBATCH`` runs ``MiniBatchKMeans`` with ``kmeans_batch_size``
+        samples per step
+    :param kmeans_init: ``KMEANS_PLUSPLUS`` seeds randomly, ``PIVOTED_QR``
+        seeds deterministically from the pivots of a QR decomposition of the
+        embedding, which needs a single run
+    :param kmeans_batch_size: mini-batch size of ``MINIBATCH``
+    :param warm_start_kmeans: seed the centroids of a component with the
+        ones found by the previous call on the same nodes, when the number of
+        clusters is the same. Eigenvector signs are normalized so that the
+        embeddings of both calls agree, and only the centroids of the last
+        call's components are kept. Statistics of the last call are available
+        in ``kmeans_stats``.
+    :param stationary_method: how the PageRank system giving the stationary
+        distribution is solved. ``BICGSTAB`` solves warm-start from the
+        distributions of earlier calls and stop after ``max_power_iterations``
+        iterations.
+    :param stationary_batch_max_size: largest component whose stationary
+        distribution is solved together with the others in one block-diagonal
+        system; larger components are solved one by one
+    """
+
     def __init__(
         self,
         all_refs: Iterable[T],
@@ -30,6 +290,20 @@ class SpectralClustering(
         min_component_size: int = 3,
         k_means_random_state: int = 21359482,
         max_power_iterations: int = 1000,
+        eigensolver: Eigensolver = Eigensolver.AUTO,
+        dense_max_size: int = 1000,
+        lobpcg_min_size: int = 5000,
+        adaptive_eigengap: bool = False,
+        eigengap_block: int = 8,
+        eigengap_ratio: float = 5.0,
+        stationary_method: StationaryMethod = StationaryMethod.DIRECT,
+        stationary_batch_max_size: int = 1000,
+        batch_small_components: bool = False,
+        batch_max_size: int = 50,
+        kmeans: KMeansMethod = KMeansMethod.LLOYD,
+        kmeans_init: KMeansInit = KMeansInit.KMEANS_PLUSPLUS,
+        kmeans_batch_size: int = 1024,
+        warm_start_kmeans: bool = False,
     ):
         if min_component_size < 3:
             raise ValueError("minimum detected weak component size must be at least 3")
@@ -44,7 +318,29 @@ class SpectralClustering(
         self._detect_wcc = detect_wcc
         self._min_component_size = min_component_size
         self._kmeans_random = k_means_random_state
-        self._max_iter = max_power_iterations
+        self._stationary = StationarySolver(
+            alpha, stationary_method, max_iterations=max_power_iterations
+        )
+        self._stationary_batch_max_size = stationary_batch_max_size
+        self._eigensolver = Eigensolver(eigensolver)
+        self._dense_max_size = dense_max_size
+        self._lobpcg_min_size = lobpcg_min_size
+        self._adaptive = adaptive_eigengap
+        self._eigengap_block = max(4, eigengap_block)
+        self._eigengap_ratio = eigengap_ratio
+        self._batch_max_size = batch_max_size if batch_small_components else 0
+        self._kmeans = KMeansMethod(kmeans)
+        self._kmeans_init = KMeansInit(kmeans_init)
+        self._kmeans_batch_size = kmeans_batch_size
+        self._warm_start = warm_start_kmeans
+        self._centroids: dict[frozenset[T], np.ndarray] = {}
+        self._live_centroids: set[frozenset[T]] = set()
+        self._kmeans_stats: list[KMeansStats] = []
+
+    @property
+    def kmeans_stats(self) -> list[KMeansStats]:
+        """Assignment stage statistics of every component of the last call."""
+        return list(self._kmeans_stats)
 
     @classmethod
     def _transition_matrix(cls, adjacency_matrix: sp.csr_matrix):
@@ -56,25 +352,6 @@ class SpectralClustering(
         D_inv = sp.diags(inv)
         return D_inv @ adjacency_matrix
 
-    def _power_iter(
-        self, transition_matrix: sp.csr_matrix, alpha=0.85, epsilon=1e-5
-    ) -> np.ndarray:
-        n = transition_matrix.shape[0]
-        pi = np.ones(n) / n  # uniform initial distribution
-        teleport = np.full(n, (1 - alpha) / n)
-
-        for i in range(1, self._max_iter + 1):
-            pi_new = alpha * transition_matrix.T @ pi + teleport
-            pi_new /= pi_new.sum()
-            diff = np.linalg.norm(pi_new - pi)
-            if diff < epsilon:
-                return pi_new
-            pi = pi_new
-
-        raise RuntimeError(
-            f"Power iteration did not converge after {self._max_iter} iterations."
-        )
-
     @classmethod
     def _rw_laplacian(
         cls,
@@ -92,23 +369,101 @@ class SpectralClustering(
 
         return random_walk_laplacian
 
+    def _solver_for(self, size: int) -> Eigensolver:
+        if self._eigensolver != Eigensolver.AUTO:
+            return self._eigensolver
+        if size <= self._dense_max_size:
+            return Eigensolver.DENSE
+        if size < self._lobpcg_min_size:
+            return Eigensolver.ARPACK
+        return Eigensolver.LOBPCG
+
+    def _smallest_eigenpairs(
+        self, laplacian: sp.csr_array, max_clusters: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        n = laplacian.shape[0]
+        solver = self._solver_for(n)
+        adaptive = self._adaptive
+        # the LOBPCG block must stay small next to the matrix
+        lobpcg_max = (n - 1) // 5
+        if solver == Eigensolver.LOBPCG and max_clusters > lobpcg_max >= 2:
+            max_clusters, adaptive = lobpcg_max, True
+        if not adaptive:
+            return smallest_eigenpairs(
+                laplacian, max_clusters, solver, self._kmeans_random
+            )
+        block = min(self._eigengap_block, max_clusters)
+        eigenvectors = None
+        while True:
+            eigenvalues, eigenvectors = smallest_eigenpairs(
+                laplacian, block, solver, self._kmeans_random, initial=eigenvectors
+            )
+            if block >= max_clusters or has_clear_eigengap(
+                eigenvalues, self._eigengap_ratio
+            ):
+                return eigenvalues, eigenvectors
+            block = min(2 * block, max_clusters)
+
+    def _assign(
+        self, embedding: np.ndarray, k: int, nodes: list[T] | None
+    ) -> np.ndarray:
+        key = frozenset(nodes) if self._warm_start and nodes is not None else None
+        previous = self._centroids.get(key) if key is not None else None
+        if previous is not None and previous.shape == (k, embedding.shape[1]):
+            init, n_init = previous, 1
+        elif self._kmeans_init == KMeansInit.PIVOTED_QR:
+            init, n_init = pivoted_qr_seeds(embedding, k), 1
+        else:
+            init, n_init = "k-means++", "auto"
+        if self._kmeans == KMeansMethod.MINIBATCH:
+            model = MiniBatchKMeans(
+                n_clusters=k,
+                init=init,
+                n_init=n_init,
+                batch_size=self._kmeans_batch_size,
+                random_state=self._kmeans_random,
+            )
+        else:
+            model = KMeans(
+                n_clusters=k, init=init, n_init=n_init, random_state=self._kmeans_random
+            )
+        labels = model.fit_predict(embedding)
+        if key is not None:
+            self._centroids[key] = model.cluster_centers_
+            self._live_centroids.add(key)
+        self._kmeans_stats.append(
+            KMeansStats(
+                len(embedding), int(k), float(model.inertia_), int(model.n_iter_)
+            )
+        )
+        return labels
+
     def _spectral_clustering(
-        self, adjacency_matrix: sp.csr_matrix, max_clusters: int | None = None
+        self,
+        adjacency_matrix: sp.csr_matrix,
+        max_clusters: int | None = None,
+        pi: np.ndarray | None = None,
+        nodes: list[T] | None = None,
+        transitions: sp.csr_array | None = None,
     ):
-        M = self._transition_matrix(adjacency_matrix)
-        pi = self._power_iter(M, self._alpha)
+        M = transitions
+        if M is None:
+            M = self._transition_matrix(adjacency_matrix)
+        if pi is None:
+            pi = self._stationary.solve(M)
         L_rw = self._rw_laplacian(M, pi)
 
         if max_clusters is None or max_clusters < 2:
             max_clusters = max(2, int(adjacency_matrix.shape[0] // 2))
 
         # smallest k eigenvectors of the random walk Laplacian
-        eigenvalues, eigenvectors = sp_linalg.eigsh(L_rw, k=max_clusters, which="SM")
+        eigenvalues, eigenvectors = self._smallest_eigenpairs(L_rw, max_clusters)
+        eigenvectors = normalize_signs(eigenvectors)
         gaps = np.diff(eigenvalues)
 
-        if max_clusters > 2:
+        if len(eigenvalues) > 2:
             k = np.argmax(gaps[1:]) + 2
-        elif max_clusters == 2:
+        elif len(eigenvalues) == 2:
             k = 2 if gaps[0] > self._epsilon else 1
         else:
             k = 1
@@ -118,20 +473,103 @@ class SpectralClustering(
         norms[norms == 0] = 1
         embedding /= norms
 
-        labels = KMeans(n_clusters=k, random_state=self._kmeans_random).fit_predict(
-            embedding
-        )
+        labels = self._assign(embedding, k, nodes)
 
         return labels, eigenvalues, eigenvectors, embedding, pi, gaps
 
-    def _extract_graph_clusters(
-        self, g: nx.Graph, max_clusters: int | None = None
+    def _batched_labels(self, adjacency: np.ndarray) -> np.ndarray:
+        """Cluster a ``(batch, n, n)`` stack of equally sized components."""
+        adjacency = adjacency**self._beta
+        out_degrees = adjacency.sum(axis=2, keepdims=True)
+        transitions = adjacency / np.where(out_degrees > 0, out_degrees, 1)
+        pi_sqrt = np.sqrt(self._stationary.solve_dense(transitions))
+        s = pi_sqrt[:, :, None] * transitions / pi_sqrt[:, None, :]
+        n = adjacency.shape[1]
+        laplacians = np.eye(n) - 0.5 * (s + np.swapaxes(s, 1, 2))
+        eigenvalues, eigenvectors = np.linalg.eigh(laplacians)
+
+        max_clusters = max(2, n // 2)
+        gaps = np.diff(eigenvalues[:, :max_clusters], axis=1)
+        if max_clusters > 2:
+            ks = np.argmax(gaps[:, 1:], axis=1) + 2
+        else:
+            ks = np.where(gaps[:, 0] > self._epsilon, 2, 1)
+
+        rng = np.random.default_rng(self._kmeans_random)
+        labels = np.zeros((len(adjacency), n), dtype=np.int64)
+        inertias = np.zeros(len(adjacency))
+        iterations = np.zeros(len(adjacency), dtype=np.int64)
+        for k in np.unique(ks).tolist():
+            if k == 1:
+                continue
+            rows = np.flatnonzero(ks == k)
+            embedding = eigenvectors[rows, :, :k]
+            norms = np.linalg.norm(embedding, axis=2, keepdims=True)
+            embedding = embedding / np.where(norms == 0, 1, norms)
+            labels[rows], inertias[rows], iterations[rows] = batched_kmeans(
+                embedding, k, rng
+            )
+        self._kmeans_stats.extend(
+            KMeansStats(n, k, inertia, count)
+            for k, inertia, count in zip(
+                ks.tolist(), inertias.tolist(), iterations.tolist()
+            )
+        )
+        return labels
+
+    def _extract_batched(
+        self, snapshot: CsrGraph[T], components: list[set[T]]
     ) -> Iterable[Iterable[T]]:
-        nodes = list(g.nodes)
-        adj_matrix = nx.to_scipy_sparse_array(g).power(n=self._beta)
+        by_size: dict[int, list[set[T]]] = {}
+        for c in components:
+            by_size.setdefault(len(c), []).append(c)
+        groups = list(by_size.items())
+        group_of = np.full(len(snapshot), -1, dtype=np.int64)
+        batch_of = np.zeros(len(snapshot), dtype=np.int64)
+        position = np.zeros(len(snapshot), dtype=np.int64)
+        group_members = []
+        for g, (size, group) in enumerate(groups):
+            members = snapshot.index_array(node for c in group for node in c).reshape(
+                len(group), size
+            )
+            group_of[members] = g
+            batch_of[members] = np.arange(len(group))[:, None]
+            position[members] = np.arange(size)
+            group_members.append(members)
+
+        # bucket the edges of batched components by group once
+        src, dst, weights = snapshot.edges()
+        inside = np.flatnonzero(group_of[src] >= 0)
+        inside = inside[np.argsort(group_of[src[inside]], kind="stable")]
+        src, dst, weights = src[inside], dst[inside], weights[inside]
+        bounds = np.searchsorted(group_of[src], np.arange(len(groups) + 1))
+        nodes = snapshot.nodes
+        for g, ((size, group), members) in enumerate(zip(groups, group_members)):
+            lo, hi = bounds[g], bounds[g + 1]
+            adjacency = np.zeros((len(group), size, size))
+            adjacency[
+                batch_of[src[lo:hi]], position[src[lo:hi]], position[dst[lo:hi]]
+            ] = weights[lo:hi]
+
+            for row, labels in zip(members.tolist(), self._batched_labels(adjacency)):
+                clusters: dict[int, list[T]] = {}
+                for idx, label in zip(row, labels.tolist()):
+                    clusters.setdefault(label, []).append(nodes[idx])
+                yield from clusters.values()
+
+    def _adjacency(self, g: nx.Graph) -> sp.csr_array:
+        return nx.to_scipy_sparse_array(g).power(n=self._beta)
 
+    def _extract_graph_clusters(
+        self,
+        nodes: list[T],
+        adjacency: sp.csr_array,
+        max_clusters: int | None = None,
+        pi: np.ndarray | None = None,
+        transitions: sp.csr_array | None = None,
+    ) -> Iterable[Iterable[T]]:
         lbl, lambda_, v, emb, pi, gaps = self._spectral_clustering(
-            adj_matrix, max_clusters
+            adjacency, max_clusters, pi, nodes, transitions
         )
         clusters = {}
         for idx, cluster_label in enumerate(lbl):
@@ -139,20 +577,62 @@ class SpectralClustering(
         for cluster_no, cluster in clusters.items():
             yield cluster
 
-    def __call__(self, similarity_graph: ReferenceGraph) -> frozenset[frozenset[T]]:
-        g = self._to_directed(similarity_graph, self._threshold)
+    def _extract_components(self, components: list[nx.Graph]) -> Iterable[Iterable[T]]:
+        small = [c for c in components if len(c) <= self._stationary_batch_max_size]
+        large = [c for c in components if len(c) > self._stationary_batch_max_size]
+        nodes = [list(c.nodes) for c in small]
+        adjacencies = [self._adjacency(c) for c in small]
+        transitions = [self._transition_matrix(a) for a in adjacencies]
+        distributions = self._stationary.solve_many(transitions, nodes)
+        for component_nodes, adjacency, M, pi in zip(
+            nodes, adjacencies, transitions, distributions
+        ):
+            yield from self._extract_graph_clusters(
+                component_nodes, adjacency, pi=pi, transitions=M
+            )
+        for c in large:
+            component_nodes, adjacency = list(c.nodes), self._adjacency(c)
+            M = self._transition_matrix(adjacency)
+            pi = self._stationary.solve(M, component_nodes)
+            yield from self._extract_graph_clusters(
+                component_nodes, adjacency, pi=pi, transitions=M
+            )
+
+    def __call__(
+        self, similarity_graph: ReferenceGraph | CsrGraph[T]
+    ) -> frozenset[frozenset[T]]:
+        return self.partition(similarity_graph).to_frozensets()
+
+    def partition(self, similarity_graph: ReferenceGraph | CsrGraph[T]) -> Partition[T]:
+        snapshot = self._snapshot(similarity_graph)
+        g = self._to_directed(snapshot)
+        self._kmeans_stats = []
+        self._live_centroids = set()
         clusters = []
         wcc = nx.weakly_connected_components(g)
         if self._detect_wcc:
+            components = []
+            batched = []
             for c in wcc:
-                if len(c) >= self._min_component_size:
-                    clusters.extend(self._extract_graph_clusters(g.subgraph(c)))
-                else:
+                if len(c) < self._min_component_size:
                     clusters.append(c)
+                elif len(c) <= self._batch_max_size:
+                    batched.append(c)
+                else:
+                    components.append(g.subgraph(c))
+            clusters.extend(self._extract_batched(snapshot, batched))
+            clusters.extend(self._extract_components(components))
         else:
             if self._k is None or self._k < 2:
                 max_clusters = sum(n // 2 for n in map(len, wcc))
             else:
                 max_clusters = self._k
-            clusters.extend(self._extract_graph_clusters(g, max_clusters))
+            clusters.extend(
+                self._extract_graph_clusters(
+                    list(g.nodes), self._adjacency(g), max_clusters
+                )
+            )
+        # forget the centroids of components that no longer exist
+        for key in self._centroids.keys() - self._live_centroids:
+            del self._centroids[key]
         return self._add_singletons(self._items, clusters)
@@ -0,0 +1,146 @@
+from collections.abc import Hashable, Sequence
+from enum import StrEnum
+
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as sp_linalg
+
+
+class StationaryMethod(StrEnum):
+    DIRECT = "direct"
+    BICGSTAB = "bicgstab"
+
+
+class StationarySolver:
+    """Stationary distribution of a random walk with uniform teleportation.
+
+    Instead of iterating ``pi <- alpha * P.T @ pi + (1 - alpha) / n``, the
+    PageRank linear system ``(I - alpha * P.T) x = (1 - alpha) / n`` is solved
+    once and ``x`` is normalized to sum to one. Walks stuck in nodes without
+    outgoing edges teleport uniformly.
+
+    :param alpha: probability of following an edge rather than teleporting
+    :param method: ``DIRECT`` factorizes the system with ``spsolve``.
+        ``BICGSTAB`` solves it iteratively, starting from the distribution
+        cached for the same nodes by earlier solves, so graphs that changed
+        only slightly converge in a few iterations.
+    :param tolerance: relative residual at which ``BICGSTAB`` stops
+    :param max_iterations: iteration limit of ``BICGSTAB``
+    """
+
+    def __init__(
+        self,
+        alpha: float = 0.85,
+        method: StationaryMethod = StationaryMethod.DIRECT,
+        tolerance: float = 1e-10,
+        max_iterations: int = 1000,
+    ) -> None:
+        if not 0 < alpha < 1:
+            raise ValueError("alpha must be in (0, 1)")
+        self._alpha = alpha
+        self._method = StationaryMethod(method)
+        self._tolerance = tolerance
+        self._max_iterations = max_iterations
+        self._cache: dict[Hashable, float] = {}
+        self._iterations = 0
+
+    @property
+    def iterations(self) -> int:
+        """Number of ``BICGSTAB`` iterations run by the last solve."""
+        return self._iterations
+
+    def clear(self) -> None:
+        """Forget the distributions cached by earlier solves."""
+        self._cache.clear()
+
+    def _initial(
+        self, sizes: list[int], nodes: Sequence[Hashable] | None
+    ) -> np.ndarray:
+        uniform = np.repeat(1.0 / np.asarray(sizes, dtype=np.float64), sizes)
+        if nodes is None or not self._cache:
+            return uniform
+        cached = np.fromiter(
+            (self._cache.get(node, np.nan) for node in nodes),
+            dtype=np.float64,
+            count=len(nodes),
+        )
+        return np.where(np.isnan(cached), uniform, cached)
+
+    def _solve(
+        self,
+        transitions: sp.sparray,
+        sizes: list[int],
+        nodes: Sequence[Hashable] | None,
+    ) -> np.ndarray:
+        n = transitions.shape[0]
+        system = sp.csc_array(sp.eye(n) - self._alpha * transitions.T)
+        rhs = np.repeat((1 - self._alpha) / np.asarray(sizes, dtype=np.float64), sizes)
+        self._iterations = 0
+        if self._method == StationaryMethod.DIRECT:
+            x = sp_linalg.spsolve(system, rhs)
+        else:
+
+            def count(_):
+                self._iterations += 1
+
+            x, info = sp_linalg.bicgstab(
+                system,
+                rhs,
+                x0=self._initial(sizes, nodes),
+                rtol=self._tolerance,
+                maxiter=self._max_iterations,
+                callback=count,
+            )
+            if info != 0:
+                raise RuntimeError(
+                    f"BiCGSTAB did not converge after {self._max_iterations} iterations."
+                )
+        x = np.maximum(np.atleast_1d(x), 0)
+        bounds = np.concatenate(([0], np.cumsum(sizes)))
+        totals = np.add.reduceat(x, bounds[:-1]) if n > 0 else x
+        x /= np.repeat(totals, sizes)
+        if nodes is not None and self._method == StationaryMethod.BICGSTAB:
+            self._cache.update(zip(nodes, x.tolist()))
+        return x
+
+    def solve(
+        self, transitions: sp.sparray, nodes: Sequence[Hashable] | None = None
+    ) -> np.ndarray:
+        """Return the stationary distribution of the row-stochastic ``transitions``.
+
+        :param transitions: transition matrix whose rows sum to one or zero
+        :param nodes: identifiers of the rows. When given, ``BICGSTAB`` caches
+            the result per node to warm-start later solves.
+        """
+        return self._solve(transitions, [transitions.shape[0]], nodes)
+
+    def solve_many(
+        self,
+        transitions: Sequence[sp.sparray],
+        nodes: Sequence[Sequence[Hashable]] | None = None,
+    ) -> list[np.ndarray]:
+        """Solve many walks at once, stacked into one block-diagonal system.
+
+        Every block is normalized on its own, so the results equal separate
+        ``solve`` calls.
+        """
+        if not transitions:
+            return []
+        sizes = [matrix.shape[0] for matrix in transitions]
+        stacked_nodes = None
+        if nodes is not None:
+            stacked_nodes = [node for block in nodes for node in block]
+        x = self._solve(sp.block_diag(transitions, format="csr"), sizes, stacked_nodes)
+        return np.split(x, np.cumsum(sizes)[:-1])
+
+    def solve_dense(self, transitions: np.ndarray) -> np.ndarray:
+        """Solve a stack of small dense walks of equal size at once.
+
+        :param transitions: ``(batch, n, n)`` array of transition matrices
+        :return: ``(batch, n)`` array of stationary distributions
+        """
+        n = transitions.shape[-1]
+        system = np.eye(n) - self._alpha * np.swapaxes(transitions, -1, -2)
+        rhs = np.full(transitions.shape[:-1] + (1,), (1 - self._alpha) / n)
+        x = np.maximum(np.linalg.solve(system, rhs)[..., 0], 0)
+        return x / x.sum(axis=-1, keepdims=True)
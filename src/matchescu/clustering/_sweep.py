@@ -0,0 +1,142 @@
+from collections.abc import Iterable
+from typing import Generic
+
+import numpy as np
+from scipy.sparse import csgraph
+
+from matchescu.similarity import ReferenceGraph
+
+from matchescu.clustering._base import T, CsrGraph, Partition
+from matchescu.clustering._ecp import EquivalenceClassPartitioner
+
+
+class ThresholdSweep(Generic[T]):
+    """Equivalence class partitions of a similarity graph at many thresholds.
+
+    The edges are sorted by weight once and merged incrementally from the
+    heaviest down, so sweeping any number of thresholds costs a single
+    ``O(m log m)`` pass plus one ``O(n)`` read-out per threshold. The
+    partition reported for threshold ``t`` is the one
+    ``EquivalenceClassClustering(all_refs, t)`` computes. Like it, a match
+    involving a node outside ``all_refs`` raises ``KeyError``.
+    """
+
+    def __init__(self, all_refs: Iterable[T]) -> None:
+        self._items = list(set(all_refs))
+        self._known = set(self._items)
+
+    def _snapshot(
+        self, similarity_graph: ReferenceGraph | CsrGraph[T], threshold: float
+    ) -> CsrGraph[T]:
+        if isinstance(similarity_graph, CsrGraph):
+            if similarity_graph.threshold > threshold:
+                raise ValueError(
+                    f"snapshot built at {similarity_graph.threshold} cannot be "
+                    f"swept down to {threshold}"
+                )
+            graph = similarity_graph.restrict(threshold).with_nodes(self._items)
+        else:
+            graph = CsrGraph.from_reference_graph(
+                similarity_graph, threshold, self._items
+            )
+        src, dst, _ = graph.edges()
+        for idx in np.unique(np.concatenate((src, dst))).tolist():
+            if graph.nodes[idx] not in self._known:
+                raise KeyError(graph.nodes[idx])
+        return graph
+
+    def __call__(
+        self,
+        similarity_graph: ReferenceGraph | CsrGraph[T],
+        thresholds: Iterable[float],
+    ) -> dict[float, frozenset[frozenset[T]]]:
+        return {
+            threshold: partition.to_frozensets()
+            for threshold, partition in self.partitions(
+                similarity_graph, thresholds
+            ).items()
+        }
+
+    def partitions(
+        self,
+        similarity_graph: ReferenceGraph | CsrGraph[T],
+        thresholds: Iterable[float],
+    ) -> dict[float, Partition[T]]:
+        thresholds = sorted(set(thresholds), reverse=True)
+        if not thresholds:
+            return {}
+        graph = self._snapshot(similarity_graph, thresholds[-1])
+        src, dst, weights = graph.edges()
+        order = np.argsort(-weights, kind="stable")
+        src, dst, weights = src[order], dst[order], weights[order]
+
+        ecp = EquivalenceClassPartitioner(graph.nodes)
+        positions = ecp.index_array(graph.nodes)
+        src, dst = positions[src], positions[dst]
+        # edges [0, cutoffs[i]) weigh at least thresholds[i]
+        cutoffs = np.searchsorted(-weights, -np.asarray(thresholds), side="right")
+
+        partitions = {}
+        merged = 0
+        for threshold, cutoff in zip(thresholds, cutoffs.tolist()):
+            ecp.union_pairs(src[merged:cutoff], dst[merged:cutoff])
+            merged = cutoff
+            partitions[threshold] = ecp.partition()
+        return partitions
+
+    def merge_tree(
+        self, similarity_graph: ReferenceGraph | CsrGraph[T]
+    ) -> tuple[tuple[T, ...], np.ndarray]:
+        """Compute the single-linkage merge tree of the similarity graph.
+
+        :return: the snapshot nodes and a SciPy linkage matrix over them. Row
+            ``i`` merges clusters ``Z[i, 0]`` and ``Z[i, 1]`` at distance
+            ``1 - weight`` into cluster ``n + i`` of size ``Z[i, 3]``. Clusters
+            that share no edge are joined at distance ``1.0`` so that the
+            matrix is complete and can be fed to ``scipy.cluster.hierarchy``.
+        """
+        graph = self._snapshot(similarity_graph, 0.0)
+        n = len(graph)
+        # shift weights into [1, 2] so that zero weights survive as edges, keep
+        # the strongest direction of every pair and turn it into a distance
+        adjacency = graph.to_scipy().astype(np.float64)
+        adjacency.data = adjacency.data + 1.0
+        adjacency = adjacency.maximum(adjacency.T).tocsr()
+        adjacency.data = 3.0 - adjacency.data
+        tree = csgraph.minimum_spanning_tree(adjacency).tocoo()
+        distances = tree.data - 1.0
+        order = np.argsort(distances, kind="stable")
+        tree_edges = zip(
+            tree.row[order].tolist(),
+            tree.col[order].tolist(),
+            distances[order].tolist(),
+        )
+
+        parent = list(range(n))
+        cluster = list(range(n))
+        size = [1] * n
+
+        def find(x: int) -> int:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        linkage = np.empty((max(n - 1, 0), 4), dtype=np.float64)
+        row = 0
+
+        def merge(x: int, y: int, distance: float) -> None:
+            nonlocal row
+            a, b = sorted((cluster[x], cluster[y]))
+            parent[y] = x
+            size[x] += size[y]
+            cluster[x] = n + row
+            linkage[row] = (a, b, distance, size[x])
+            row += 1
+
+        for u, v, distance in tree_edges:
+            merge(find(u), find(v), distance)
+        roots = [idx for idx in range(n) if parent[idx] == idx]
+        for root in roots[1:]:
+            merge(find(roots[0]), root, 1.0)
+        return graph.nodes, linkage
@@ -2,7 +2,7 @@ from functools import reduce
 
 import pytest
 
-from matchescu.similarity import ReferenceGraph
+from matchescu.similarity import MatchResult, ReferenceGraph
 
 
 @pytest.fixture
@@ -135,3 +135,21 @@ def ring_with_cliques_digraph(ref, matcher_mock, source):
         ReferenceGraph(directed=True),
     )
     return sim_graph
+
+
+@pytest.fixture
+def weighted_digraph(ref_id, source):
+    """Ring a→b→c→d→e→a with a distinct similarity score on every edge."""
+    scores = {
+        ("a", "b"): 0.9,
+        ("b", "c"): 0.6,
+        ("c", "d"): 0.3,
+        ("d", "e"): 0.8,
+        ("e", "a"): 0.1,
+    }
+    sim_graph = ReferenceGraph(directed=True)
+    for (x, y), score in scores.items():
+        sim_graph.add(
+            MatchResult(ref_id(x, source), ref_id(y, source), 1, [1 - score, score])
+        )
+    return sim_graph
@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from matchescu.clustering import (
+    CsrGraph,
+    ConnectedComponents,
+    MarkovClustering,
+    Partition,
+    SpectralClustering,
+    WeaklyConnectedComponents,
+)
+from tests.testutil import is_partition_over
+
+
+@pytest.fixture
+def snapshot(chain_digraph, all_refs):
+    return CsrGraph.from_reference_graph(chain_digraph, 0.75, all_refs)
+
+
+def test_snapshot_matches_reference_graph(snapshot, chain_digraph):
+    src, dst, weights = snapshot.edges()
+    nodes = snapshot.nodes
+
+    actual = {(nodes[u], nodes[v]) for u, v in zip(src, dst)}
+
+    assert actual == set(chain_digraph.matches(0.75))
+    assert np.all(weights == 1.0)
+    assert list(snapshot.indptr) == [0, 1, 2, 3, 3]
+
+
+def test_snapshot_weight(snapshot, ref_id, source):
+    a, b = ref_id("a", source), ref_id("b", source)
+
+    assert snapshot.weight(a, b) == 1.0
+    assert snapshot.weight(b, a) == 0.0
+    assert snapshot.weight(a, ref_id("z", source)) == 0.0
+
+
+@pytest.mark.parametrize("directed", [False], indirect=True)
+def test_undirected_snapshot_weight_is_symmetric(reference_graph, ref_id, source):
+    snapshot = CsrGraph.from_reference_graph(reference_graph)
+    a, b = ref_id("a", source), ref_id("b", source)
+
+    assert not snapshot.directed
+    assert snapshot.weight(a, b) == snapshot.weight(b, a) == 1.0
+
+
+def test_restrict_and_with_nodes(snapshot, ref_id, source):
+    extra = ref_id("z", source)
+
+    assert snapshot.restrict(0.5) is snapshot
+    assert snapshot.restrict(1.5).edge_count == 0
+    assert snapshot.with_nodes(snapshot.nodes) is snapshot
+    extended = snapshot.with_nodes([extra])
+    assert extended.nodes[-1] == extra
+    assert extended.neighbors(extended.index_of(extra))[0].size == 0
+
+
+@pytest.mark.parametrize(
+    "algorithm", [WeaklyConnectedComponents, MarkovClustering, ConnectedComponents]
+)
+@pytest.mark.parametrize("directed", [False], indirect=True)
+def test_algorithms_accept_snapshot(algorithm, all_refs, reference_graph):
+    clustering = algorithm(all_refs)
+    snapshot = CsrGraph.from_reference_graph(reference_graph, 0.75)
+
+    clusters = clustering(snapshot)
+
+    assert is_partition_over(all_refs, clusters)
+    assert clusters == clustering(reference_graph)
+
+
+def test_partition_from_clusters_adds_singletons():
+    partition = Partition.from_clusters("abcdef", [["a", "b", "c"], ["d", "e"]])
+
+    assert len(partition) == 3
+    assert partition.same_cluster("a", "c")
+    assert not partition.same_cluster("c", "d")
+    assert partition.members(partition.label_of("f")) == frozenset("f")
+    assert sorted(partition.sizes()) == [1, 2, 3]
+    assert list(partition.size_histogram()) == [0, 1, 1, 1]
+    assert partition.to_frozensets() == frozenset(
+        {frozenset("abc"), frozenset("de"), frozenset("f")}
+    )
+
+
+def test_partition_equality_ignores_label_values_and_item_order():
+    left = Partition(["a", "b", "c", "d"], np.array([7, 7, 3, 9]))
+    right = Partition(["d", "c", "b", "a"], np.array([0, 1, 2, 2]))
+    other = Partition(["d", "c", "b", "a"], np.array([0, 0, 2, 2]))
+
+    assert list(left.labels) == [1, 1, 0, 2]
+    assert left == right
+    assert left != other
+
+
+@pytest.mark.parametrize(
+    "algorithm", [WeaklyConnectedComponents, MarkovClustering, SpectralClustering]
+)
+def test_algorithm_partition_matches_call(algorithm, all_refs, chain_digraph):
+    clustering = algorithm(all_refs)
+
+    partition = clustering.partition(chain_digraph)
+
+    assert isinstance(partition, Partition)
+    assert partition.to_frozensets() == clustering(chain_digraph)
@@ -0,0 +1,34 @@
+import pytest
+
+from matchescu.clustering._base import GraphBackend
+from matchescu.clustering._cc import ConnectedComponents
+from tests.testutil import is_partition_over
+
+
+@pytest.mark.parametrize("backend", list(GraphBackend))
+@pytest.mark.parametrize(
+    "directed,all_refs,reference_graph",
+    [(False, ["a", "b", "c", "d", "e"], [("a", "b"), ("c", "b"), ("d", "d")])],
+    indirect=["directed", "all_refs", "reference_graph"],
+)
+def test_components(backend, all_refs, reference_graph, ref_id, source):
+    cc = ConnectedComponents(all_refs, backend=backend)
+
+    clusters = cc(reference_graph)
+
+    assert is_partition_over(all_refs, clusters)
+    assert clusters == frozenset(
+        {
+            frozenset(ref_id(x, source) for x in "abc"),
+            frozenset({ref_id("d", source)}),
+            frozenset({ref_id("e", source)}),
+        }
+    )
+
+
+@pytest.mark.parametrize("backend", list(GraphBackend))
+def test_directed_graphs_are_rejected(backend, all_refs, chain_digraph):
+    cc = ConnectedComponents(all_refs, backend=backend)
+
+    with pytest.raises(ValueError):
+        cc(chain_digraph)
@@ -1,6 +1,13 @@
+import numpy as np
 import pytest
 
-from matchescu.clustering._center import ParentCenterClustering
+from matchescu.clustering._center import (
+    CenterClustering,
+    MergeCenterClustering,
+    ParentCenterClustering,
+    StarClustering,
+    resolve_roots,
+)
 from pyresolvemetrics import (
     twi,
     cluster_comparison_measure,
@@ -61,6 +68,43 @@ def test_ring_with_cliques(pc, all_refs, ring_with_cliques_digraph):
     assert len(clusters) == 1, "Expected everything to be clustered together"
 
 
+def test_resolve_roots_follows_chains_and_cycles():
+    # 0 <- 1 <- 2, the cycle 3 -> 4 -> 5 -> 3 with 6 hanging off 5
+    parents = np.array([0, 0, 1, 4, 5, 3, 5])
+
+    assert resolve_roots(parents).tolist() == [0, 0, 0, 3, 3, 3, 3]
+
+
+@pytest.mark.parametrize(
+    "algorithm,expected",
+    [
+        (CenterClustering, [{"a", "b"}, {"c", "d", "e"}]),
+        (MergeCenterClustering, [{"a", "b", "c", "d", "e"}]),
+        (StarClustering, [{"a", "b", "e"}, {"c", "d"}]),
+    ],
+)
+@pytest.mark.parametrize("all_refs", [["a", "b", "c", "d", "e"]], indirect=True)
+def test_center_family_on_weighted_ring(
+    algorithm, expected, all_refs, weighted_digraph
+):
+    clusters = algorithm(all_refs, threshold=0.0)(weighted_digraph)
+
+    assert is_partition_over(all_refs, clusters)
+    assert {frozenset(ref.label for ref in cluster) for cluster in clusters} == {
+        frozenset(cluster) for cluster in expected
+    }
+
+
+@pytest.mark.parametrize(
+    "algorithm", [CenterClustering, MergeCenterClustering, StarClustering]
+)
+def test_center_family_on_clique(algorithm, all_refs, clique_digraph):
+    clusters = algorithm(all_refs)(clique_digraph)
+
+    assert is_partition_over(all_refs, clusters)
+    assert len(clusters) == 1
+
+
 @pytest.mark.skip(reason="only run this locally - not in CI")
 def test_partitioning_on_real_data(
     matcher_mock, dataset_refs, dataset_ground_truth, dataset_fwd_graph
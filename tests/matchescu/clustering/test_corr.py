@@ -1,6 +1,9 @@
 import pytest
 
-from matchescu.clustering._corr import WeightedCorrelationClustering
+from matchescu.clustering._corr import (
+    ParallelPivotClustering,
+    WeightedCorrelationClustering,
+)
 from pyresolvemetrics import twi
 from tests.testutil import is_partition_over
 
@@ -56,6 +59,64 @@ def test_ring_with_cliques(corr, all_refs, ring_with_cliques_digraph):
     assert len(clusters) >= 3
 
 
+@pytest.mark.parametrize(
+    "all_refs", [["a", "b", "c", "d", "e", "f", "g", "h", "i", "j"]], indirect=True
+)
+def test_restarts_keep_fewest_disagreements(all_refs, ring_with_cliques_digraph):
+    single = WeightedCorrelationClustering(all_refs, random_seed=5)
+    restarted = WeightedCorrelationClustering(all_refs, random_seed=5, restarts=8)
+    refined = WeightedCorrelationClustering(
+        all_refs, random_seed=5, restarts=8, refine=True
+    )
+
+    first = single.partition(ring_with_cliques_digraph)
+    best = restarted.partition(ring_with_cliques_digraph)
+    improved = refined.partition(ring_with_cliques_digraph)
+
+    assert is_partition_over(all_refs, improved.to_frozensets())
+    score = single.disagreements
+    assert score(ring_with_cliques_digraph, best) <= score(
+        ring_with_cliques_digraph, first
+    )
+    assert score(ring_with_cliques_digraph, improved) <= score(
+        ring_with_cliques_digraph, best
+    )
+
+
+def test_restarts_in_process_pool(all_refs, ring_digraph):
+    serial = WeightedCorrelationClustering(all_refs, random_seed=1, restarts=4)
+    pooled = WeightedCorrelationClustering(
+        all_refs, random_seed=1, restarts=4, max_workers=2
+    )
+
+    assert serial.partition(ring_digraph) == pooled.partition(ring_digraph)
+
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_parallel_pivot_clique(max_workers, all_refs, clique_digraph):
+    clusters = ParallelPivotClustering(all_refs, max_workers=max_workers)(
+        clique_digraph
+    )
+
+    assert is_partition_over(all_refs, clusters)
+    assert len(clusters) == 1
+
+
+@pytest.mark.parametrize(
+    "all_refs", [["a", "b", "c", "d", "e", "f", "g", "h", "i", "j"]], indirect=True
+)
+def test_parallel_pivot_threads_match_serial(all_refs, ring_with_cliques_digraph):
+    serial = ParallelPivotClustering(all_refs, epsilon=1.0, random_seed=3)
+    threaded = ParallelPivotClustering(
+        all_refs, epsilon=1.0, random_seed=3, max_workers=4
+    )
+
+    partition = serial.partition(ring_with_cliques_digraph)
+
+    assert is_partition_over(all_refs, partition.to_frozensets())
+    assert partition == threaded.partition(ring_with_cliques_digraph)
+
+
 @pytest.mark.skip(reason="only run this locally - not in CI")
 def test_partitioning_on_real_data(
     matcher_mock, dataset_refs, dataset_ground_truth, dataset_fwd_graph
@@ -67,3 +128,21 @@ def test_partitioning_on_real_data(
     assert is_partition_over(dataset_refs, actual)
     score = twi(dataset_ground_truth, actual)
     assert 0 <= score <= 1
+
+
+def test_same_seed_same_partition(all_refs, ring_with_cliques_digraph):
+    first = WeightedCorrelationClustering(all_refs, random_seed=7)
+    second = WeightedCorrelationClustering(all_refs, random_seed=7)
+
+    assert first.partition(ring_with_cliques_digraph) == second.partition(
+        ring_with_cliques_digraph
+    )
+
+
+@pytest.mark.parametrize("directed", [False], indirect=True)
+def test_undirected_pivot_takes_both_neighbours(all_refs, reference_graph):
+    clusters = WeightedCorrelationClustering(all_refs, random_seed=0)(reference_graph)
+
+    assert is_partition_over(all_refs, clusters)
+    assert all(len(cluster) <= 3 for cluster in clusters)
+    assert len(clusters) <= 2
@@ -1,4 +1,6 @@
+import numpy as np
 import pytest
+import scipy.sparse as sp
 
 from matchescu.clustering._gacl import ACLClustering, SeedStrategy, PartitionStrategy
 from pyresolvemetrics import pair_comparison_measure
@@ -92,6 +94,48 @@ def test_global_acl_ring_with_cliques(global_acl, all_refs, ring_with_cliques_di
     assert sizes == [3, 7], f"Expected cluster sizes [3, 7], got {sizes}"
 
 
+def _random_walk(seed: int, n: int, density: float):
+    rng = np.random.default_rng(seed)
+    adjacency = sp.random(n, n, density=density, random_state=seed, format="csr")
+    out_degrees = np.asarray(adjacency.sum(axis=1)).ravel()
+    # nodes without outgoing edges become sinks with a self-loop
+    adjacency = adjacency + sp.diags((out_degrees == 0).astype(float))
+    out_degrees = np.asarray(adjacency.sum(axis=1)).ravel()
+    transitions = sp.csr_matrix(sp.diags(1 / out_degrees) @ adjacency)
+    phi = rng.random(n) * (rng.random(n) < 0.8)
+    phi /= phi.sum()
+    return transitions, phi, rng.permutation(n)
+
+
+def test_sweep_conductances_match_direct_computation():
+    transitions, phi, order = _random_walk(3, 30, 0.15)
+
+    conductances, errors = ACLClustering._sweep_conductances(order, transitions, phi)
+
+    for j in range(29):
+        inside = np.zeros(30, dtype=bool)
+        inside[order[: j + 1]] = True
+        expected = ACLClustering._measure_conductance(inside, transitions, phi)
+        assert abs(conductances[j] - expected) <= errors[j]
+    assert conductances[-1] == 1.0
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_best_prefix_matches_prefix_by_prefix_sweep(seed):
+    transitions, phi, order = _random_walk(seed, 40, 0.04)
+    best_cond, best = float("inf"), None
+    inside = np.zeros(40, dtype=bool)
+    for j in range(40):
+        inside[order[j]] = True
+        cond = ACLClustering._measure_conductance(inside, transitions, phi)
+        if cond < best_cond:
+            best_cond, best = cond, j
+
+    algo = ACLClustering(range(40))
+
+    assert algo._best_prefix(order, transitions, phi) == (best, best_cond)
+
+
 @pytest.mark.skip(reason="only run this locally - not in CI")
 def test_global_acl_on_real_data(
     matcher_mock, dataset_refs, dataset_ground_truth, dataset_bidi_graph
@@ -1,6 +1,15 @@
+import numpy as np
 import pytest
-
-from matchescu.clustering._hac import HierarchicalAgglomerativeClustering
+from scipy.cluster.hierarchy import fcluster, linkage
+from scipy.spatial.distance import pdist, squareform
+
+from matchescu.clustering._base import Partition
+from matchescu.clustering._hac import (
+    Dendrogram,
+    HierarchicalAgglomerativeClustering,
+    Linkage,
+    sparse_linkage,
+)
 from pyresolvemetrics import twi
 from tests.testutil import is_partition_over
 
@@ -56,6 +65,120 @@ def test_ring_with_cliques(hac, all_refs, ring_with_cliques_digraph):
     assert len(clusters) == 1, "Expected everything to be clustered together"
 
 
+@pytest.mark.parametrize("method", list(Linkage))
+def test_sparse_linkage_matches_dense_linkage(method):
+    rng = np.random.default_rng(4)
+    n = 30
+    a = rng.integers(0, n, 60)
+    b = rng.integers(0, n, 60)
+    keys = np.unique(np.minimum(a, b) * n + np.maximum(a, b))
+    keys = keys[keys // n != keys % n]
+    a, b = keys // n, keys % n
+    similarities = np.round(rng.uniform(0.0, 1.0, len(a)), 2)
+    dense = np.eye(n)
+    dense[a, b] = dense[b, a] = similarities
+
+    expected = linkage(squareform(1 - dense, checks=False), method=str(method))
+    actual = sparse_linkage(n, a, b, similarities, method)
+
+    assert np.allclose(np.sort(actual[:, 2]), np.sort(expected[:, 2]))
+    for t in (0.2, 0.5, 0.8):
+        left = fcluster(actual, t, criterion="distance")
+        right = fcluster(expected, t, criterion="distance")
+        assert len(set(zip(left, right))) == len(set(left)) == len(set(right))
+
+
+@pytest.mark.parametrize(
+    "all_refs", [["a", "b", "c", "d", "e", "f", "g", "h", "i", "j"]], indirect=True
+)
+def test_dendrogram_cuts_match_fcluster(hac, all_refs, ring_with_cliques_digraph):
+    dendrogram = hac.dendrogram(ring_with_cliques_digraph)
+
+    for t in (0.0, 0.3, 0.5, 0.9, 1.0):
+        expected = fcluster(dendrogram.linkage, t, criterion="distance")
+        assert dendrogram.cut(t) == Partition(dendrogram.items, expected)
+    for k in range(1, len(all_refs) + 1):
+        assert len(dendrogram.cut_k(k)) == k
+
+
+def test_dendrogram_round_trip(hac, all_refs, ring_digraph, tmp_path):
+    dendrogram = hac.dendrogram(ring_digraph)
+    path = tmp_path / "dendrogram.npy"
+
+    dendrogram.save(path)
+    loaded = Dendrogram.load(path)
+
+    assert loaded.items == dendrogram.items
+    assert np.array_equal(np.load(path), dendrogram.linkage)
+    assert loaded.cut(0.5) == dendrogram.cut(0.5)
+
+
+@pytest.mark.parametrize("min_parallel_size", [2, 1000])
+@pytest.mark.parametrize("method", list(Linkage))
+@pytest.mark.parametrize(
+    "all_refs", [["a", "b", "c", "d", "e", "f", "g", "h", "i", "j"]], indirect=True
+)
+def test_component_split_matches_global_cut(
+    method, min_parallel_size, all_refs, weighted_digraph
+):
+    for t in (0.2, 0.5, 0.75):
+        hac = HierarchicalAgglomerativeClustering(
+            all_refs,
+            max_cluster_distance=t,
+            linkage=method,
+            max_workers=2,
+            min_parallel_size=min_parallel_size,
+        )
+
+        partition = hac.partition(weighted_digraph)
+
+        assert partition == hac.dendrogram(weighted_digraph).cut(t)
+
+
+def _blobs() -> np.ndarray:
+    rng = np.random.default_rng(2)
+    return np.concatenate(
+        (
+            rng.normal([1.0, 0.0, 0.0], 0.05, (15, 3)),
+            rng.normal([0.0, 1.0, 0.0], 0.05, (15, 3)),
+        )
+    )
+
+
+def test_embeddings_with_all_neighbours_match_dense_linkage():
+    embeddings = _blobs()
+    refs = [f"r{i}" for i in range(len(embeddings))]
+    hac = HierarchicalAgglomerativeClustering(refs, n_neighbors=len(refs), block_size=7)
+
+    dendrogram = hac.embedding_dendrogram(refs, embeddings)
+
+    distances = np.clip(squareform(pdist(embeddings, "cosine")), 0.0, 1.0)
+    expected = linkage(squareform(distances, checks=False), method="average")
+    assert np.allclose(np.sort(dendrogram.linkage[:, 2]), np.sort(expected[:, 2]))
+
+
+def test_partition_embeddings_from_memory_map(tmp_path):
+    path = tmp_path / "embeddings.npy"
+    np.save(path, _blobs())
+    embeddings = np.load(path, mmap_mode="r")
+    refs = [f"r{i}" for i in range(len(embeddings))]
+    hac = HierarchicalAgglomerativeClustering(
+        refs, max_cluster_distance=0.5, n_neighbors=14, block_size=8
+    )
+
+    partition = hac.partition_embeddings(refs, embeddings)
+
+    assert sorted(partition.sizes()) == [15, 15]
+    assert partition.same_cluster("r0", "r14")
+    assert not partition.same_cluster("r0", "r15")
+
+
+def test_exported_from_package():
+    from matchescu.clustering import HierarchicalAgglomerativeClustering as exported
+
+    assert exported is HierarchicalAgglomerativeClustering
+
+
 @pytest.mark.skip(reason="only run this locally - not in CI")
 def test_partitioning_on_real_data(
     matcher_mock, dataset_refs, dataset_ground_truth, dataset_fwd_graph
@@ -67,3 +190,14 @@ def test_partitioning_on_real_data(
     assert is_partition_over(dataset_refs, actual)
     score = twi(dataset_ground_truth, actual)
     assert 0 <= score <= 1
+
+
+def test_embeddings_reject_unbounded_metric():
+    embeddings = _blobs()
+    refs = [f"r{i}" for i in range(len(embeddings))]
+    hac = HierarchicalAgglomerativeClustering(refs, distance_function="euclidean")
+
+    with pytest.raises(ValueError):
+        hac.embedding_dendrogram(refs, embeddings)
+    with pytest.raises(ValueError):
+        hac.partition_embeddings(refs, embeddings)
@@ -1,5 +1,7 @@
+import numpy as np
 import pytest
 
+from matchescu.clustering._base import CsrGraph
 from matchescu.clustering._mcl import MarkovClustering
 from pyresolvemetrics import twi
 from tests.testutil import is_partition_over
@@ -56,6 +58,101 @@ def test_ring_with_cliques(mcl, all_refs, ring_with_cliques_digraph):
     assert len(clusters) > 3, "Expected ring with cliques to explode"
 
 
+@pytest.mark.parametrize(
+    "all_refs,reference_graph",
+    [(["a", "b", "c", "d"], [("a", "b"), ("b", "c"), ("c", "a")])],
+    indirect=True,
+)
+def test_cycle_without_attractor_is_clustered(mcl, all_refs, reference_graph):
+    clusters = mcl(reference_graph)
+
+    assert is_partition_over(all_refs, clusters)
+
+
+def _two_cliques(size: int) -> CsrGraph[int]:
+    src, dst = np.nonzero(~np.eye(size, dtype=bool))
+    src = np.concatenate((src, src + size))
+    dst = np.concatenate((dst, dst + size))
+    return CsrGraph.from_edges(
+        list(range(2 * size)), src, dst, np.ones(len(src)), True, 0.75
+    )
+
+
+def test_memory_ceiling():
+    graph = _two_cliques(20)
+
+    bounded = MarkovClustering(
+        graph.nodes, max_memory=2 * 20 * 40 * 12, dense_max_size=0
+    )
+    clusters = bounded(graph)
+
+    assert is_partition_over(graph.nodes, clusters)
+    assert {len(cluster) for cluster in clusters} == {20}
+    with pytest.raises(MemoryError):
+        MarkovClustering(graph.nodes, max_memory=100, dense_max_size=0)(graph)
+
+
+def test_top_k_pruning_keeps_cliques():
+    graph = _two_cliques(30)
+
+    clusters = MarkovClustering(graph.nodes, max_per_column=3)(graph)
+
+    assert clusters == frozenset({frozenset(range(30)), frozenset(range(30, 60))})
+
+
+@pytest.mark.parametrize("directed", [True, False])
+def test_dense_and_sparse_paths_agree(directed):
+    rng = np.random.default_rng(11)
+    src = rng.integers(0, 120, 200)
+    dst = rng.integers(0, 120, 200)
+    weights = rng.uniform(0.75, 1.0, 200)
+    graph = CsrGraph.from_edges(list(range(120)), src, dst, weights, directed, 0.75)
+
+    dense = MarkovClustering(graph.nodes).partition(graph)
+    sparse = MarkovClustering(graph.nodes, dense_max_size=0).partition(graph)
+
+    assert dense == sparse
+
+
+def _clique_chain(cliques: int, size: int) -> CsrGraph[int]:
+    src, dst = np.nonzero(~np.eye(size, dtype=bool))
+    offsets = np.repeat(np.arange(cliques) * size, len(src))
+    src = np.concatenate(
+        (np.tile(src, cliques) + offsets, np.arange(cliques - 1) * size)
+    )
+    dst = np.concatenate(
+        (np.tile(dst, cliques) + offsets, np.arange(1, cliques) * size)
+    )
+    n = cliques * size
+    return CsrGraph.from_edges(list(range(n)), src, dst, np.ones(len(src)), True, 0.75)
+
+
+def test_multilevel_recovers_chained_cliques():
+    graph = _clique_chain(40, 8)
+
+    partition = MarkovClustering(
+        graph.nodes, multilevel=True, dense_max_size=0, coarse_size=100
+    ).partition(graph)
+
+    assert is_partition_over(graph.nodes, partition.to_frozensets())
+    assert all(partition.same_cluster(node, node - node % 8) for node in graph.nodes)
+    assert len(partition) == 40
+
+
+@pytest.mark.skip(reason="only run this locally - not in CI")
+def test_multilevel_on_real_data(
+    matcher_mock, dataset_refs, dataset_ground_truth, dataset_fwd_graph
+):
+    plain = MarkovClustering(dataset_refs, threshold=0.4)(dataset_fwd_graph)
+    multilevel = MarkovClustering(
+        dataset_refs, threshold=0.4, multilevel=True, coarse_size=200
+    )(dataset_fwd_graph)
+
+    assert is_partition_over(dataset_refs, multilevel)
+    plain_score = twi(dataset_ground_truth, plain)
+    assert twi(dataset_ground_truth, multilevel) >= plain_score - 0.05
+
+
 @pytest.mark.skip(reason="only run this locally - not in CI")
 def test_partitioning_on_real_data(
     matcher_mock, dataset_refs, dataset_ground_truth, dataset_fwd_graph
@@ -0,0 +1,101 @@
+from functools import partial
+
+import numpy as np
+import pytest
+
+from matchescu.clustering._ecp import EquivalenceClassClustering
+from matchescu.clustering._mcl import MarkovClustering
+from matchescu.clustering._parallel import (
+    ParallelComponentClustering,
+    SharedArrays,
+    Transport,
+    _attached,
+    attach_shared,
+    detach_shared,
+)
+from matchescu.clustering._wcc import WeaklyConnectedComponents
+from tests.testutil import is_partition_over
+
+EDGES = [
+    ("a", "b"),
+    ("b", "c"),
+    ("c", "a"),
+    ("d", "e"),
+    ("e", "f"),
+    ("f", "g"),
+    ("g", "d"),
+    ("h", "i"),
+]
+
+
+@pytest.mark.parametrize(
+    "all_refs,reference_graph",
+    [(["a", "b", "c", "d", "e", "f", "g", "h", "i", "j"], EDGES)],
+    indirect=True,
+)
+@pytest.mark.parametrize("transport", list(Transport))
+@pytest.mark.parametrize("min_parallel_size", [2, 4, 1000])
+@pytest.mark.parametrize(
+    "algorithm",
+    [EquivalenceClassClustering, MarkovClustering, WeaklyConnectedComponents],
+)
+def test_matches_algorithm_on_whole_graph(
+    algorithm, min_parallel_size, transport, all_refs, reference_graph
+):
+    wrapper = ParallelComponentClustering(
+        all_refs,
+        partial(algorithm, threshold=0.75),
+        max_workers=2,
+        min_parallel_size=min_parallel_size,
+        transport=transport,
+    )
+
+    clusters = wrapper(reference_graph)
+
+    assert is_partition_over(all_refs, clusters)
+    assert clusters == algorithm(all_refs)(reference_graph)
+
+
+def test_single_component(all_refs, chain_digraph):
+    wrapper = ParallelComponentClustering(
+        all_refs, MarkovClustering, max_workers=1, min_parallel_size=2
+    )
+
+    partition = wrapper.partition(chain_digraph)
+
+    assert len(partition) == 1
+    assert is_partition_over(all_refs, partition.to_frozensets())
+
+
+@pytest.mark.parametrize(
+    "all_refs,reference_graph",
+    [(["a", "b", "c", "d", "e", "f", "g", "h", "i", "j"], EDGES)],
+    indirect=True,
+)
+def test_pooled_components_are_split(all_refs, reference_graph):
+    wrapper = ParallelComponentClustering(
+        all_refs, MarkovClustering, max_workers=2, min_parallel_size=3
+    )
+
+    clusters = wrapper(reference_graph)
+
+    assert is_partition_over(all_refs, clusters)
+    assert len(clusters) >= 4
+
+
+def test_shared_arrays_are_read_only_views():
+    indptr = np.array([0, 2, 3], dtype=np.int64)
+    empty = np.empty(0, dtype=np.float64)
+
+    with SharedArrays(indptr=indptr, weights=empty) as shared:
+        attached = attach_shared(shared.spec)
+
+        assert np.array_equal(attached["indptr"], indptr)
+        assert attached["weights"].shape == (0,)
+        assert not attached["indptr"].flags.writeable
+        with pytest.raises(ValueError):
+            attached["indptr"][0] = 1
+
+        del attached
+        detach_shared()
+        assert not any(name in _attached for name, _, _ in shared.spec.values())
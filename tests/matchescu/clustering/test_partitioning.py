@@ -1,6 +1,11 @@
+import networkx as nx
+import numpy as np
 import pytest
 
-from matchescu.clustering._ecp import EquivalenceClassClustering
+from matchescu.clustering._ecp import (
+    EquivalenceClassClustering,
+    EquivalenceClassPartitioner,
+)
 
 
 @pytest.fixture
@@ -88,3 +93,34 @@ def test_isolated_item(compute_partition, reference_graph, all_refs, ref_id):
             frozenset({ref_id("d", "test")}),
         }
     )
+
+
+def test_long_chain_does_not_recurse():
+    items = list(range(50_000))
+    ecp = EquivalenceClassPartitioner(items)
+
+    partition = ecp(zip(items, items[1:]))
+
+    assert partition == frozenset({frozenset(items)})
+
+
+def test_union_pairs_matches_connected_components():
+    rng = np.random.default_rng(42)
+    items = list(range(1000))
+    u = rng.integers(0, len(items), 700)
+    v = rng.integers(0, len(items), 700)
+    ecp = EquivalenceClassPartitioner(items)
+    expected = ecp(zip(u.tolist(), v.tolist()))
+
+    ecp._reset()
+    ecp.union_pairs(ecp.index_array(u.tolist()), ecp.index_array(v.tolist()))
+
+    assert ecp.partition().to_frozensets() == expected
+    assert expected == frozenset(nx_components(items, u, v))
+
+
+def nx_components(items, u, v):
+    g = nx.Graph()
+    g.add_nodes_from(items)
+    g.add_edges_from(zip(u.tolist(), v.tolist()))
+    return (frozenset(c) for c in nx.connected_components(g))
@@ -1,6 +1,20 @@
+import warnings
+
+import numpy as np
 import pytest
+import scipy.sparse as sp
+import scipy.sparse.linalg as sp_linalg
 
-from matchescu.clustering._spectral import SpectralClustering
+from matchescu.clustering._base import CsrGraph, Partition
+from matchescu.clustering._stationary import StationarySolver
+from matchescu.clustering._spectral import (
+    Eigensolver,
+    KMeansInit,
+    KMeansMethod,
+    SpectralClustering,
+    normalize_signs,
+    smallest_eigenpairs,
+)
 from pyresolvemetrics import (
     pair_comparison_measure,
     cluster_comparison_measure,
@@ -54,13 +68,185 @@ def test_clique(spectral, all_refs, clique_digraph):
     ],
     indirect=True,
 )
-def test_ring_with_cliques(spectral, all_refs, ring_with_cliques_digraph):
+@pytest.mark.parametrize("eigensolver", list(Eigensolver))
+def test_ring_with_cliques(eigensolver, all_refs, ring_with_cliques_digraph):
+    spectral = SpectralClustering(all_refs, eigensolver=eigensolver)
+
     clusters = spectral(ring_with_cliques_digraph)
 
     assert is_partition_over(all_refs, clusters)
     assert len(clusters) == 3, "Clean separation along bridges expected"
 
 
+def _planted_adjacency(clusters: int, size: int) -> sp.csr_array:
+    rng = np.random.default_rng(7)
+    n = clusters * size
+    offsets = np.repeat(np.arange(clusters) * size, size * size // 4)
+    src = np.concatenate(
+        (offsets + rng.integers(0, size, offsets.size), rng.integers(0, n, n // 10))
+    )
+    dst = np.concatenate(
+        (offsets + rng.integers(0, size, offsets.size), rng.integers(0, n, n // 10))
+    )
+    adjacency = sp.csr_array((np.ones(src.size), (src, dst)), shape=(n, n))
+    adjacency = sp.csr_array(((adjacency + adjacency.T) > 0).astype(np.float64))
+    adjacency.setdiag(0)
+    adjacency.eliminate_zeros()
+    return adjacency
+
+
+def _planted_laplacian(clusters: int, size: int) -> sp.csr_array:
+    adjacency = _planted_adjacency(clusters, size)
+    spectral = SpectralClustering(range(adjacency.shape[0]))
+    transitions = spectral._transition_matrix(adjacency)
+    return spectral._rw_laplacian(transitions, StationarySolver().solve(transitions))
+
+
+@pytest.mark.parametrize("eigensolver", [Eigensolver.ARPACK, Eigensolver.LOBPCG])
+def test_sparse_eigensolvers_match_dense(eigensolver):
+    laplacian = _planted_laplacian(6, 50)
+    expected, _ = smallest_eigenpairs(laplacian, 8, Eigensolver.DENSE)
+
+    eigenvalues, eigenvectors = smallest_eigenpairs(laplacian, 8, eigensolver, 0)
+
+    assert eigenvectors.shape == (300, 8)
+    assert np.allclose(eigenvalues, expected, atol=1e-4)
+
+
+@pytest.mark.parametrize("clusters,size", [(6, 50), (12, 25)])
+@pytest.mark.parametrize("eigensolver", [Eigensolver.DENSE, Eigensolver.LOBPCG])
+def test_adaptive_eigengap_stops_early(eigensolver, clusters, size):
+    adjacency = _planted_adjacency(clusters, size)
+    n = clusters * size
+    full = SpectralClustering(range(n), eigensolver=eigensolver)
+    adaptive = SpectralClustering(
+        range(n), eigensolver=eigensolver, adaptive_eigengap=True
+    )
+
+    expected, *_ = full._spectral_clustering(adjacency)
+    labels, eigenvalues, *_ = adaptive._spectral_clustering(adjacency)
+
+    assert len(eigenvalues) <= 2 * clusters
+    assert Partition(range(n), labels) == Partition(range(n), expected)
+    assert len(np.unique(labels)) == clusters
+
+
+def test_auto_eigensolver_runs_lobpcg_on_large_components(monkeypatch):
+    graph = _planted_graph(6, 50)
+    expected = SpectralClustering(graph.nodes).partition(graph)
+    spectral = SpectralClustering(graph.nodes, dense_max_size=100, lobpcg_min_size=300)
+    calls = []
+    lobpcg = sp_linalg.lobpcg
+
+    def spy(A, X, *args, **kwargs):
+        calls.append(X.shape[1])
+        return lobpcg(A, X, *args, **kwargs)
+
+    monkeypatch.setattr(sp_linalg, "lobpcg", spy)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)
+        partition = spectral.partition(graph)
+
+    assert calls and max(calls) < 300 // 5
+    assert partition == expected
+
+
+def _clique_pairs(count: int) -> CsrGraph:
+    rng = np.random.default_rng(0)
+    src, dst, base = [], [], 0
+    for _ in range(count):
+        sizes = rng.integers(2, 8, 2).tolist()
+        for lo, size in ((base, sizes[0]), (base + sizes[0], sizes[1])):
+            for u in range(lo, lo + size):
+                src.extend([u] * (size - 1))
+                dst.extend(v for v in range(lo, lo + size) if v != u)
+        src.append(base)
+        dst.append(base + sizes[0])
+        base += sum(sizes)
+    weights = np.full(len(src), 0.9)
+    return CsrGraph.from_edges(list(range(base)), np.array(src), np.array(dst), weights)
+
+
+def test_batched_small_components_match_per_component_path():
+    graph = _clique_pairs(40)
+    nodes = graph.nodes
+
+    expected = SpectralClustering(nodes).partition(graph)
+    batched = SpectralClustering(nodes, batch_small_components=True)
+
+    actual = batched.partition(graph)
+
+    assert len(actual) == 80
+    assert actual == expected
+    assert [stats.clusters for stats in batched.kmeans_stats] == [2] * 40
+
+
+def test_stationary_batching_does_not_change_partition():
+    graph = _clique_pairs(10)
+    expected = SpectralClustering(graph.nodes).partition(graph)
+    spectral = SpectralClustering(graph.nodes, stationary_batch_max_size=0)
+
+    assert spectral.partition(graph) == expected
+
+
+def _planted_graph(clusters: int, size: int) -> CsrGraph:
+    adjacency = _planted_adjacency(clusters, size).tocoo()
+    weights = np.full(adjacency.nnz, 0.9)
+    nodes = list(range(clusters * size))
+    return CsrGraph.from_edges(nodes, adjacency.row, adjacency.col, weights)
+
+
+@pytest.mark.parametrize("kmeans_init", list(KMeansInit))
+@pytest.mark.parametrize("kmeans", list(KMeansMethod))
+def test_kmeans_stage_options(kmeans, kmeans_init):
+    graph = _planted_graph(6, 50)
+    expected = SpectralClustering(graph.nodes).partition(graph)
+    spectral = SpectralClustering(graph.nodes, kmeans=kmeans, kmeans_init=kmeans_init)
+
+    partition = spectral.partition(graph)
+
+    assert partition == expected
+    [stats] = spectral.kmeans_stats
+    assert (stats.size, stats.clusters) == (300, 6)
+    assert stats.inertia >= 0
+    assert stats.iterations >= 1
+
+
+def test_warm_started_kmeans_reuses_centroids():
+    graph = _planted_graph(6, 50)
+    spectral = SpectralClustering(graph.nodes, warm_start_kmeans=True)
+    expected = spectral.partition(graph)
+    [cold] = spectral.kmeans_stats
+
+    partition = spectral.partition(graph)
+
+    [warm] = spectral.kmeans_stats
+    assert partition == expected
+    assert warm.iterations == 1
+    assert warm.inertia == pytest.approx(cold.inertia)
+
+
+def test_normalized_eigenvectors_ignore_solver_signs():
+    _, eigenvectors = smallest_eigenpairs(_planted_laplacian(6, 50), 6)
+    flipped = eigenvectors * np.array([1, -1, 1, -1, -1, 1])
+
+    assert np.array_equal(normalize_signs(flipped), normalize_signs(eigenvectors))
+    columns = np.arange(6)
+    largest = normalize_signs(flipped)[np.abs(flipped).argmax(axis=0), columns]
+    assert (largest > 0).all()
+
+
+def test_warm_start_forgets_vanished_components():
+    graph = _clique_pairs(3)
+    spectral = SpectralClustering(graph.nodes, warm_start_kmeans=True)
+    spectral.partition(graph)
+    assert len(spectral._centroids) == 3
+
+    spectral.partition(_clique_pairs(1))
+
+    assert len(spectral._centroids) == 1
+
+
 @pytest.mark.skip(reason="only run this locally - not in CI")
 @pytest.mark.parametrize(
     "dataset",
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from matchescu.clustering._stationary import StationaryMethod, StationarySolver
+
+
+def _transitions(n: int, seed: int) -> sp.csr_array:
+    rng = np.random.default_rng(seed)
+    src = np.concatenate((np.arange(n), rng.integers(0, n, 3 * n)))
+    dst = np.concatenate((np.roll(np.arange(n), 1), rng.integers(0, n, 3 * n)))
+    adjacency = sp.csr_array((np.ones(src.size), (src, dst)), shape=(n, n))
+    adjacency.sum_duplicates()
+    return sp.csr_array(sp.diags(1 / adjacency.sum(axis=1)) @ adjacency)
+
+
+def _power_iteration(transitions: sp.csr_array, alpha: float) -> np.ndarray:
+    n = transitions.shape[0]
+    pi = np.full(n, 1 / n)
+    for _ in range(1000):
+        pi = alpha * transitions.T @ pi + (1 - alpha) / n
+        pi /= pi.sum()
+    return pi
+
+
+@pytest.mark.parametrize("method", list(StationaryMethod))
+def test_matches_power_iteration(method):
+    transitions = _transitions(50, 1)
+
+    pi = StationarySolver(0.85, method).solve(transitions)
+
+    assert np.isclose(pi.sum(), 1)
+    assert np.allclose(pi, _power_iteration(transitions, 0.85), atol=1e-8)
+
+
+@pytest.mark.parametrize("method", list(StationaryMethod))
+def test_block_diagonal_solve_matches_separate_solves(method):
+    blocks = [_transitions(n, n) for n in (3, 10, 25)]
+    solver = StationarySolver(method=method)
+
+    batched = solver.solve_many(blocks)
+
+    assert len(batched) == len(blocks)
+    for block, pi in zip(blocks, batched):
+        assert np.allclose(pi, solver.solve(block), atol=1e-8)
+
+
+def test_dense_batch_matches_sparse_solve():
+    blocks = [_transitions(12, seed) for seed in range(5)]
+    solver = StationarySolver()
+
+    batched = solver.solve_dense(np.stack([block.toarray() for block in blocks]))
+
+    assert batched.shape == (5, 12)
+    for block, pi in zip(blocks, batched):
+        assert np.allclose(pi, solver.solve(block))
+
+
+def test_warm_start_from_cached_nodes():
+    transitions = _transitions(500, 3)
+    perturbed = transitions.tolil()
+    perturbed[0, :] = 0
+    perturbed[0, 1] = 1
+    perturbed = sp.csr_array(perturbed)
+    nodes = list(range(500))
+    solver = StationarySolver(method=StationaryMethod.BICGSTAB)
+    solver.solve(transitions, nodes)
+    cold = solver.iterations
+    solver.solve(transitions, nodes)
+    unchanged = solver.iterations
+
+    pi = solver.solve(perturbed, nodes)
+
+    assert unchanged == 0
+    assert solver.iterations <= cold
+    assert np.allclose(pi, StationarySolver().solve(perturbed), atol=1e-8)
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from scipy.cluster.hierarchy import fcluster
+
+from matchescu.clustering._base import CsrGraph
+from matchescu.clustering._ecp import EquivalenceClassClustering
+from matchescu.clustering._sweep import ThresholdSweep
+
+
+@pytest.mark.parametrize("all_refs", [["a", "b", "c", "d", "e", "f"]], indirect=True)
+def test_sweep_matches_equivalence_classes(all_refs, weighted_digraph):
+    thresholds = [0.05, 0.2, 0.3, 0.5, 0.75, 0.85, 0.95]
+    sweep = ThresholdSweep(all_refs)
+
+    partitions = sweep(weighted_digraph, thresholds)
+
+    assert list(partitions) == sorted(thresholds, reverse=True)
+    for threshold in thresholds:
+        expected = EquivalenceClassClustering(all_refs, threshold)(weighted_digraph)
+        assert partitions[threshold] == expected
+
+
+@pytest.mark.parametrize("all_refs", [["a", "b", "c", "d"]], indirect=True)
+def test_sweep_rejects_unknown_matched_nodes(all_refs, weighted_digraph):
+    sweep = ThresholdSweep(all_refs)
+
+    with pytest.raises(KeyError):
+        EquivalenceClassClustering(all_refs, 0.05)(weighted_digraph)
+    with pytest.raises(KeyError):
+        sweep(weighted_digraph, [0.05, 0.5])
+    with pytest.raises(KeyError):
+        sweep.merge_tree(weighted_digraph)
+
+
+def test_sweep_rejects_stricter_snapshot(all_refs, weighted_digraph):
+    snapshot = CsrGraph.from_reference_graph(weighted_digraph, 0.5)
+
+    with pytest.raises(ValueError):
+        ThresholdSweep(all_refs)(snapshot, [0.25])
+
+
+@pytest.mark.parametrize("all_refs", [["a", "b", "c", "d", "e", "f"]], indirect=True)
+def test_merge_tree_cuts_match_sweep(all_refs, weighted_digraph):
+    sweep = ThresholdSweep(all_refs)
+
+    nodes, linkage = sweep.merge_tree(weighted_digraph)
+
+    assert linkage.shape == (len(nodes) - 1, 4)
+    assert np.all(np.diff(linkage[:, 2]) >= 0)
+    for threshold in [0.2, 0.5, 0.7, 0.85]:
+        labels = fcluster(linkage, 1 - threshold, criterion="distance")
+        clusters = {}
+        for node, label in zip(nodes, labels):
+            clusters.setdefault(label, set()).add(node)
+        expected = sweep(weighted_digraph, [threshold])[threshold]
+        assert frozenset(map(frozenset, clusters.values())) == expected
@@ -1,5 +1,6 @@
 import pytest
 
+from matchescu.clustering._base import GraphBackend
 from matchescu.clustering._wcc import WeaklyConnectedComponents
 from pyresolvemetrics import twi
 from tests.testutil import is_partition_over
@@ -67,3 +68,19 @@ def test_partitioning_on_real_data(
     assert is_partition_over(dataset_refs, actual)
     score = twi(dataset_ground_truth, actual)
     assert 0 <= score <= 1
+
+
+@pytest.mark.parametrize(
+    "all_refs",
+    [["a", "b", "c", "d", "e", "f", "g", "h", "i", "j", "k"]],
+    indirect=True,
+)
+@pytest.mark.parametrize("threshold", [0.0, 0.75, 1.5])
+def test_backends_agree(all_refs, ring_with_cliques_digraph, threshold):
+    scipy_wcc = WeaklyConnectedComponents(all_refs, threshold, GraphBackend.SCIPY)
+    nx_wcc = WeaklyConnectedComponents(all_refs, threshold, GraphBackend.NETWORKX)
+
+    expected = nx_wcc(ring_with_cliques_digraph)
+
+    assert scipy_wcc(ring_with_cliques_digraph) == expected
+    assert is_partition_over(all_refs, expected)